@@ -1,21 +1,19 @@
+import os
+import time
+
 import dash
-from dash import dcc, html
+from dash import Patch, dcc, html
 from dash.dependencies import Input, Output, State
-import plotly.graph_objects as go
-import pandas as pd
+from flask import Response
 import numpy as np
-from scipy.interpolate import griddata
-from scipy.ndimage import gaussian_filter
-import warnings
-import re
-
-from data_fetch import get_options_data
-from volatility_calc import (
-    implied_volatility,
-    calculate_implied_volatility_with_market_data,
-    validate_implied_volatility,
-)
-from arbitrage import detect_arbitrage
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from metrics import record_figure_payload, registry, span
+from payload import PROFILE_SERIALIZATION, array_bytes, encode_array
+from pipeline import PipelineError, get_surface
+from quality import FAILURE_COLUMNS
+from scheduler import get_scheduler, start_scheduler_from_env
 
 app = dash.Dash(__name__)
 app.title = "Options Volatility Surface"
@@ -548,6 +546,7 @@ app.layout = html.Div([
         ])
     ]),
     dcc.Store(id="theme-store", data=True),
+    dcc.Store(id="surface-key", data=None),
     html.Main(className="main-content", children=[
         html.Div(className="controls-card", children=[
             html.H2(style={
@@ -654,6 +653,17 @@ app.layout = html.Div([
                 className="arbitrage-content",
                 children=[]
             )
+        ]),
+        html.Div(className="arbitrage-card", style={"marginTop": "2rem"}, children=[
+            html.H3(className="arbitrage-title", children=[
+                "🧪 Data Quality",
+                html.Span(id="quality-status", className="status-indicator status-success", children="Clean")
+            ]),
+            html.Div(
+                id='quality-report',
+                className="arbitrage-content",
+                children=[]
+            )
         ])
     ])
 ])
@@ -690,135 +700,45 @@ def toggle_y_axis(n_clicks, current):
     new_value = "moneyness" if current == "strike" else "strike"
     return get_toggle_label(new_value), new_value
 
-@app.callback(
-    Output('vol-surface-plot', 'figure'),
-    Output('arbitrage-messages', 'children'),
-    Output('status-indicator', 'children'),
-    Output('status-indicator', 'className'),
-    Output('arbitrage-status', 'children'),
-    Output('arbitrage-status', 'className'),
-    Input('update-button', 'n_clicks'),
-    Input('theme-store', 'data'),
-    State('input-ticker', 'value'),
-    State('input-rfr', 'value'),
-    State('y-axis-toggle-store', 'data')
-)
-def update_surface(n_clicks, is_dark, ticker, rfr_percentage, axis_scale):
-    """Fetch data, compute IVs, build the surface, detect arbitrage."""
-    if not ticker:
-        return (
-            dash.no_update,
-            "Please enter a valid ticker symbol.",
-            "Error",
-            "status-indicator status-warning",
-            "Error",
-            "status-indicator status-warning",
-        )
-
-
-    rfr = 4.725
-    if rfr_percentage is not None:
-        rfr = float(rfr_percentage) / 100.0
-
-
-    try:
-        options_df, spot_price = get_options_data(ticker)
-    except Exception as e:
-        return (
-            dash.no_update,
-            f"Error fetching data for {ticker}: {e}",
-            "Error",
-            "status-indicator status-warning",
-            "Error",
-            "status-indicator status-warning",
-        )
-
-    if options_df.empty:
-        return (
-            dash.no_update,
-            f"No options data available for {ticker}.",
-            "No Data",
-            "status-indicator status-warning",
-            "No Data",
-            "status-indicator status-warning",
-        )
-
-
-    calls = options_df.copy()
-    calls = calculate_implied_volatility_with_market_data(calls, ticker)
-
-    iv_issues = validate_implied_volatility(calls)
-    if iv_issues:
-        print("IV Calculation Issues:", iv_issues)
-
-
-    lower_strike = 0.5 * spot_price
-    upper_strike = 1.5 * spot_price
-    calls = calls[(calls['strike'] >= lower_strike) & (calls['strike'] <= upper_strike)]
-
-    calls = calls.dropna(subset=['imp_vol'])
-    if calls.empty:
-        return (
-            dash.no_update,
-            "Implied volatility calculation failed for all options.",
-            "Error",
-            "status-indicator status-warning",
-            "Error",
-            "status-indicator status-warning",
-        )
-
-
-    unique_expiries = np.sort(calls['days_to_expiry'].unique())
-    min_strike = calls.groupby('days_to_expiry')['strike'].min().max()
-    max_strike = calls.groupby('days_to_expiry')['strike'].max().min()
-    strike_values = np.linspace(min_strike, max_strike, num=120)
-
-    y_axis_label = "Strike Price"
-    y_vals = strike_values
+def theme_colors(is_dark):
+    if is_dark:
+        return {
+            "text_color": "#fff",
+            "colorbar_bg": "rgba(30,41,59,0.85)",
+            "colorscale": "Viridis",
+        }
+    return {
+        "text_color": "#000",
+        "colorbar_bg": "rgba(255,255,255,0.85)",
+        "colorscale": "Turbo",
+    }
+
+def axis_values(result, axis_scale):
     if axis_scale == 'moneyness':
-        y_axis_label = "Moneyness (K/S)"
-        y_vals = strike_values / spot_price
+        return "Moneyness (K/S)", result['strikes'] / result['spot_price']
+    return "Strike Price", result['strikes']
 
+def hover_template(y_axis_label):
+    return (
+        '<b>Days to Expiry:</b> %{x}<br>'
+        f'<b>{y_axis_label}:</b> %{{y:.2f}}<br>'
+        '<b>Implied Volatility:</b> %{z:.3f}<br>'
+        '<extra></extra>'
+    )
 
-    points = calls[['days_to_expiry', 'strike']].values
-    values = calls['imp_vol'].values
-    grid_x, grid_y = np.meshgrid(unique_expiries, strike_values)
-
-
-    try:
-        surface_matrix = griddata(points, values, (grid_x, grid_y), method='cubic')
-    except Exception:
-        surface_matrix = griddata(points, values, (grid_x, grid_y), method='linear')
-
-    if np.isnan(surface_matrix).any():
-        min_vol = np.nanmin(surface_matrix)
-        surface_matrix = np.where(np.isnan(surface_matrix), min_vol, surface_matrix)
-
-
-    surface_matrix = gaussian_filter(surface_matrix, sigma=2.0)
-
-
-    if is_dark:
-        text_color = "#fff"
-        grid_color = "rgba(255,255,255,0.15)"
-        zeroline_color = "rgba(255,255,255,0.25)"
-        colorbar_bg = "rgba(30,41,59,0.85)"
-        colorscale = "Viridis"
-    else:
-        text_color = "#000"
-        grid_color = "rgba(128,128,128,0.15)"
-        zeroline_color = "rgba(128,128,128,0.2)"
-        colorbar_bg = "rgba(255,255,255,0.85)"
-        colorscale = "Turbo"
-
+def build_surface_figure(result, is_dark, axis_scale):
+    colors = theme_colors(is_dark)
+    text_color = colors["text_color"]
+    colorbar_bg = colors["colorbar_bg"]
+    y_axis_label, y_vals = axis_values(result, axis_scale)
 
     fig = go.Figure(
         data=[
             go.Surface(
-                z=surface_matrix,
-                x=unique_expiries,
-                y=y_vals,
-                colorscale=colorscale,
+                z=encode_array(result['surface']),
+                x=encode_array(result['expiries']),
+                y=encode_array(y_vals),
+                colorscale=colors["colorscale"],
                 colorbar=dict(
                     title=dict(text="Implied Volatility", font={"size": 16, "color": text_color}),
                     tickfont={"size": 14, "color": text_color},
@@ -834,12 +754,7 @@ def update_surface(n_clicks, is_dark, ticker, rfr_percentage, axis_scale):
                 ),
                 lighting=dict(ambient=0.8, diffuse=0.9, fresnel=0.1, roughness=0.1, specular=0.5),
                 hoverinfo='z+text',
-                hovertemplate=(
-                    '<b>Days to Expiry:</b> %{x}<br>'
-                    f'<b>{y_axis_label}:</b> %{{y:.2f}}<br>'
-                    '<b>Implied Volatility:</b> %{z:.3f}<br>'
-                    '<extra></extra>'
-                ),
+                hovertemplate=hover_template(y_axis_label),
             )
         ]
     )
@@ -878,58 +793,216 @@ def update_surface(n_clicks, is_dark, ticker, rfr_percentage, axis_scale):
         autosize=True,
         height=700,
     )
+    return fig
+
+def freshness_status(result):
+    """Status text and class showing how old the displayed surface is."""
+    age = time.time() - result['computed_at']
+    scheduler = get_scheduler()
+    if age < 60:
+        return "Ready", "status-indicator status-success"
+    label = f"{age / 60:.0f}m old" if age < 3600 else f"{age / 3600:.1f}h old"
+    if scheduler is not None and age > scheduler.stale_after:
+        return f"Stale · {label}", "status-indicator status-warning"
+    return f"Ready · {label}", "status-indicator status-success"
+
+def render_arbitrage(opportunities, calls, ticker):
+    if not opportunities:
+        return None, "", ""
+    expirations = dict(zip(calls['days_to_expiry'], calls['expiration'].astype(str)))
+    arb_children = []
+    for opp in sorted(opportunities, key=lambda o: o.edge, reverse=True):
+        summary = (
+            f"Significant {opp.title} at expiry {opp.expiry} days: "
+            f"credit ${opp.credit:.2f}, edge {opp.edge*100:.1f}%"
+        )
+        trade_bullets = []
+        for leg in opp.legs:
+            expiration = expirations.get(leg.expiry if leg.expiry is not None else opp.expiry, '?')
+            quantity = f"{leg.quantity:g}" if leg.quantity != 1.0 else "1"
+            trade_bullets.append(
+                html.Li([
+                    html.Strong(f"{leg.side.capitalize()} {quantity}x {ticker} Call"),
+                    f", Strike {leg.strike:.2f}, Exp {expiration}",
+                    f", at {'Ask' if leg.side == 'buy' else 'Bid'} ${leg.price:.2f}"
+                ], style={"marginBottom": "0.25rem", "fontSize": "0.97rem"})
+            )
+        arb_children.append(
+            html.Details([
+                html.Summary(f"💡 {summary}", style={"fontWeight":700, "fontSize":"1.05rem", "color":"#f59e0b"}),
+                html.Ul(trade_bullets, style={"marginLeft":"1.5rem", "marginBottom":"1rem", "marginTop":"0.5rem"})
+            ], style={"marginBottom":"1rem", "background":"#232946", "borderRadius":"10px", "padding":"0.5rem 1rem", "boxShadow":"0 2px 8px rgba(0,0,0,0.08)"})
+        )
+    return arb_children, "Alerts", "status-indicator status-warning"
+
+def render_quality(report):
+    """Per-expiry table of the expiries with data-quality issues, and the card status."""
+    if report is None or report.empty:
+        return "No options to check.", "Clean", "status-indicator status-success"
+    flagged = report[(report[FAILURE_COLUMNS].to_numpy().sum(axis=1) > 0) | report['stale']]
+    summary = (
+        f"{int(report['options'].sum())} options over {len(report)} expiries; "
+        f"median spread {report['spread_median'].median() * 100:.1f}% of mid"
+    )
+    if flagged.empty:
+        return summary, "Clean", "status-indicator status-success"
+    cell = {"padding": "0.25rem 0.75rem", "textAlign": "right"}
+    header = html.Tr([
+        html.Th(name, style=cell) for name in
+        ("Expiry", "Options", "Missing", "Extreme", "Wing", "Spread p50/p90", "Stale")
+    ])
+    rows = [
+        html.Tr([
+            html.Td(f"{row.days_to_expiry}d", style=cell),
+            html.Td(row.options, style=cell),
+            html.Td(row.missing_iv, style=cell),
+            html.Td(row.extreme_high + row.extreme_low, style=cell),
+            html.Td(row.wing_outliers, style=cell),
+            html.Td(f"{row.spread_median * 100:.1f}% / {row.spread_p90 * 100:.1f}%", style=cell),
+            html.Td(f"{row.stale_quotes}{' ⚠' if row.stale else ''}", style=cell),
+        ])
+        for row in flagged.itertuples(index=False)
+    ]
+    children = [html.Div(summary, style={"marginBottom": "0.75rem"}), html.Table([html.Thead(header), html.Tbody(rows)])]
+    return children, f"{len(flagged)} expiries", "status-indicator status-warning"
 
+@app.callback(
+    Output('vol-surface-plot', 'figure'),
+    Output('arbitrage-messages', 'children'),
+    Output('status-indicator', 'children'),
+    Output('status-indicator', 'className'),
+    Output('arbitrage-status', 'children'),
+    Output('arbitrage-status', 'className'),
+    Output('surface-key', 'data'),
+    Output('quality-report', 'children'),
+    Output('quality-status', 'children'),
+    Output('quality-status', 'className'),
+    Input('update-button', 'n_clicks'),
+    State('theme-store', 'data'),
+    State('input-ticker', 'value'),
+    State('input-rfr', 'value'),
+    State('y-axis-toggle-store', 'data')
+)
+def update_surface(n_clicks, is_dark, ticker, rfr_percentage, axis_scale):
+    """Fetch data, compute IVs, build the surface, detect arbitrage."""
+    if not ticker:
+        return (
+            dash.no_update,
+            "Please enter a valid ticker symbol.",
+            "Error",
+            "status-indicator status-warning",
+            "Error",
+            "status-indicator status-warning",
+            dash.no_update,
+            dash.no_update,
+            dash.no_update,
+            dash.no_update,
+        )
 
-    arb_msgs = detect_arbitrage(calls, spot_price, r=rfr, q=0.0)
-    if arb_msgs and (len(arb_msgs) > 0 and not (len(arb_msgs) == 1 and ('No significant' in arb_msgs[0] or not arb_msgs[0].strip()))):
-        arb_children = []
-        for msg in arb_msgs:
-            if ':' in msg:
-                summary, details = msg.split(':', 1)
-                summary = summary.strip()
-                details = details.strip()
-            else:
-                summary = msg
-                details = ''
-
-            trade_bullets = []
-            expiration = None
-            exp_match = re.search(r'expiry (\d+) days', summary)
-            if exp_match:
-                days = int(exp_match.group(1))
-                exp_row = calls[calls['days_to_expiry'] == days]
-                if not exp_row.empty:
-                    expiration = str(exp_row['expiration'].iloc[0])
-            for action, ticker, strike, expiration, side, price in re.findall(r'(Buy|Sell) 1x (\w+) Call, Strike ([\d.]+), Exp ([\d-]+), at (Ask|Bid) \$([\d.]+)', details):
-                trade_bullets.append(
-                    html.Li([
-                        html.Strong(f"{action} 1x {ticker} Call"),
-                        f", Strike {strike}, Exp {expiration if expiration else '?'}",
-                        f", at {side} ${price}"
-                    ], style={"marginBottom": "0.25rem", "fontSize": "0.97rem"})
-                )
-            arb_children.append(
-                html.Details([
-                    html.Summary(f"💡 {summary}", style={"fontWeight":700, "fontSize":"1.05rem", "color":"#f59e0b"}),
-                    html.Ul(trade_bullets, style={"marginLeft":"1.5rem", "marginBottom":"1rem", "marginTop":"0.5rem"})
-                ], style={"marginBottom":"1rem", "background":"#232946", "borderRadius":"10px", "padding":"0.5rem 1rem", "boxShadow":"0 2px 8px rgba(0,0,0,0.08)"})
-            )
-        arb_text = arb_children
-        arb_status = "Alerts"
-        arb_status_class = "status-indicator status-warning"
-    else:
-        arb_text = None
-        arb_status = ""
-        arb_status_class = ""
+
+    rfr = 4.725
+    if rfr_percentage is not None:
+        # Rounded so the same input always maps to the same cache key.
+        rfr = round(float(rfr_percentage) / 100.0, 10)
+
+
+    ticker = ticker.strip().upper()
+    scheduler = get_scheduler()
+    # Watched tickers are kept fresh in the background, so serve the cached result.
+    scheduled = scheduler is not None and scheduler.watches(ticker, rfr)
+
+    try:
+        with span("update_surface", ticker):
+            result = get_surface(ticker, rfr, refresh=not scheduled)
+    except PipelineError as e:
+        return (
+            dash.no_update,
+            str(e),
+            e.status,
+            "status-indicator status-warning",
+            e.status,
+            "status-indicator status-warning",
+            dash.no_update,
+            dash.no_update,
+            dash.no_update,
+            dash.no_update,
+        )
+
+    with span("figure_build", ticker):
+        fig = build_surface_figure(result, is_dark, axis_scale)
+    record_figure_payload(array_bytes(fig), ticker)
+    if PROFILE_SERIALIZATION:
+        with span("figure_serialize", ticker):
+            to_json_plotly(fig)
+    arb_text, arb_status, arb_status_class = render_arbitrage(result['arbitrage'], result['calls'], ticker)
+    status, status_class = freshness_status(result)
+    quality_children, quality_status, quality_status_class = render_quality(result.get('quality'))
 
     return (
         fig,
         arb_text,
-        "Ready",
-        "status-indicator status-success",
+        status,
+        status_class,
         arb_status,
         arb_status_class,
+        # The displayed strike grid, so the axis toggle can relabel it without the pipeline.
+        {"ticker": ticker, "rfr": rfr, "strikes": result['strikes'].tolist(),
+         "spot_price": float(result['spot_price'])},
+        quality_children,
+        quality_status,
+        quality_status_class,
     )
 
+@app.callback(
+    Output('vol-surface-plot', 'figure', allow_duplicate=True),
+    Input('theme-store', 'data'),
+    State('surface-key', 'data'),
+    prevent_initial_call=True
+)
+def restyle_theme(is_dark, surface_key):
+    """Recolour the current figure in place; no data is refetched."""
+    if not surface_key:
+        return dash.no_update
+    colors = theme_colors(is_dark)
+    text_color = colors["text_color"]
+    patch = Patch()
+    patch['data'][0]['colorscale'] = colors["colorscale"]
+    patch['data'][0]['colorbar']['title']['font']['color'] = text_color
+    patch['data'][0]['colorbar']['tickfont']['color'] = text_color
+    patch['data'][0]['colorbar']['bgcolor'] = colors["colorbar_bg"]
+    patch['data'][0]['colorbar']['bordercolor'] = colors["colorbar_bg"]
+    for axis in ('xaxis', 'yaxis', 'zaxis'):
+        patch['layout']['scene'][axis]['title']['font']['color'] = text_color
+    patch['layout']['font']['color'] = text_color
+    return patch
+
+@app.callback(
+    Output('vol-surface-plot', 'figure', allow_duplicate=True),
+    Input('y-axis-toggle-store', 'data'),
+    State('surface-key', 'data'),
+    prevent_initial_call=True
+)
+def restyle_axis(axis_scale, surface_key):
+    """Swap the y-axis between strike and moneyness of the displayed surface; no data is refetched."""
+    if not surface_key or 'strikes' not in surface_key:
+        return dash.no_update
+    shown = {'strikes': np.asarray(surface_key['strikes']), 'spot_price': surface_key['spot_price']}
+    y_axis_label, y_vals = axis_values(shown, axis_scale)
+    patch = Patch()
+    patch['data'][0]['y'] = encode_array(y_vals)
+    patch['data'][0]['hovertemplate'] = hover_template(y_axis_label)
+    patch['layout']['scene']['yaxis']['title']['text'] = y_axis_label
+    return patch
+
+@app.server.route("/metrics")
+def metrics_endpoint():
+    """Stage timings and IV/filter counters in Prometheus text format."""
+    return Response(registry.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    debug = True
+    # With debug on, the reloader re-runs this module in a child process that
+    # does the serving; start the scheduler only there so it feeds this cache.
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_scheduler_from_env()
+    app.run(debug=debug)
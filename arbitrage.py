@@ -1,13 +1,294 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+
 import numpy as np
 import pandas as pd
 
+from metrics import timed
+
+
+def _pct_edge_array(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.abs(numerator) / np.maximum(denominator, 1e-9)
+
+
+def _sorted_chain(calls: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    expiry = calls["days_to_expiry"].to_numpy()
+    k = calls["strike"].to_numpy(dtype=float)
+    order = np.lexsort((k, expiry))
+    return (
+        expiry[order],
+        k[order],
+        calls["bid"].to_numpy(dtype=float)[order],
+        calls["ask"].to_numpy(dtype=float)[order],
+    )
+
+
+def _butterfly_offsets(span: int) -> tuple[np.ndarray, np.ndarray]:
+    mid, right = np.triu_indices(span + 1, k=1)
+    keep = mid > 0
+    return mid[keep], right[keep]
+
+
+def _scan_chain(
+    expiry: np.ndarray,
+    k: np.ndarray,
+    bid: np.ndarray,
+    ask: np.ndarray,
+    min_edge: float,
+    min_abs_profit: float,
+    butterfly_span: int = 2,
+) -> dict[str, np.ndarray]:
+    """Vectorized within-expiry checks over a chain sorted by (expiry, strike).
+
+    Neighbouring rows are compared through shifted views; pairs and triples that
+    straddle an expiry boundary are masked out. Butterflies are checked on every
+    strike triple whose outer legs are at most `butterfly_span` rows apart, with
+    convexity weights taken from the actual strikes, via sliding-window views.
+    Returns, per check, an (n_hits, n_legs) array of leg row indices.
+    """
+    same_pair = expiry[:-1] == expiry[1:]
+    pair_legs = np.stack([np.arange(len(k) - 1), np.arange(1, len(k))], axis=1)
+
+    credit = bid[1:] - ask[:-1]
+    vertical = same_pair & (credit > min_abs_profit) & (_pct_edge_array(credit, ask[:-1]) >= min_edge)
+
+    cost_to_buy = ask[:-1] - bid[1:]
+    call_spread = same_pair & (cost_to_buy < -min_abs_profit) & (_pct_edge_array(cost_to_buy, ask[:-1]) >= min_edge)
+
+    reverse_excess = bid[:-1] - ask[1:] - (k[1:] - k[:-1])
+    reverse_spread = (
+        same_pair
+        & (reverse_excess > min_abs_profit)
+        & (_pct_edge_array(reverse_excess, ask[1:]) >= min_edge)
+    )
+
+    span = max(int(butterfly_span), 2)
+    mid_off, right_off = _butterfly_offsets(span)
+    pad = np.full(span, np.nan)
+    window = lambda x: np.lib.stride_tricks.sliding_window_view(np.concatenate([x, pad]), span + 1)
+    exp_w, k_w, bid_w, ask_w = (window(np.asarray(x, dtype=float)) for x in (expiry, k, bid, ask))
+    k1, k2, k3 = k_w[:, :1], k_w[:, mid_off], k_w[:, right_off]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w1 = (k3 - k2) / (k3 - k1)
+        w3 = (k2 - k1) / (k3 - k1)
+        rhs = w1 * ask_w[:, :1] + w3 * ask_w[:, right_off]
+        fly_excess = bid_w[:, mid_off] - rhs
+        butterfly = (
+            (exp_w[:, :1] == exp_w[:, right_off])
+            & (fly_excess > min_abs_profit)
+            & (_pct_edge_array(fly_excess, rhs) >= min_edge)
+        )
+    left, combo = np.nonzero(butterfly)
+
+    return {
+        "vertical": pair_legs[vertical],
+        "call_spread": pair_legs[call_spread],
+        "reverse_spread": pair_legs[reverse_spread],
+        "butterfly": np.stack([left, left + mid_off[combo], left + right_off[combo]], axis=1),
+    }
+
+
+KIND_TITLES = {
+    "vertical": "Vertical Dominance Arbitrage",
+    "call_spread": "Call Spread Arbitrage",
+    "reverse_spread": "Reverse Call Spread Arbitrage",
+    "butterfly": "Butterfly Arbitrage",
+    "calendar": "Calendar Spread Arbitrage",
+    "diagonal": "Diagonal Spread Arbitrage",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Leg:
+    strike: float
+    side: str
+    price: float
+    quantity: float = 1.0
+    expiry: int | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ArbitrageOpportunity:
+    kind: str
+    expiry: int
+    legs: tuple[Leg, ...]
+    credit: float
+    edge: float
+
+    @property
+    def title(self) -> str:
+        return KIND_TITLES[self.kind]
+
+
+def _build_opportunities(kind: str, legs: np.ndarray, expiry, k, bid, ask) -> list[ArbitrageOpportunity]:
+    lo, hi = legs[:, 0], legs[:, -1]
+    exp = expiry[lo].astype(int).tolist()
+    if kind == "butterfly":
+        mid = legs[:, 1]
+        k1, k2, k3 = k[lo], k[mid], k[hi]
+        w1 = (k3 - k2) / (k3 - k1)
+        w3 = (k2 - k1) / (k3 - k1)
+        rhs = w1 * ask[lo] + w3 * ask[hi]
+        excess = bid[mid] - rhs
+        edge = _pct_edge_array(excess, rhs)
+        return [
+            ArbitrageOpportunity(
+                kind, e,
+                (Leg(a, "buy", pa, wa), Leg(b, "sell", pb), Leg(c, "buy", pc, wc)),
+                x, g,
+            )
+            for e, a, b, c, pa, pb, pc, wa, wc, x, g in zip(
+                exp, k1.tolist(), k2.tolist(), k3.tolist(),
+                ask[lo].tolist(), bid[mid].tolist(), ask[hi].tolist(),
+                w1.tolist(), w3.tolist(), excess.tolist(), edge.tolist(),
+            )
+        ]
+    k_lo, k_hi = k[lo].tolist(), k[hi].tolist()
+    if kind == "reverse_spread":
+        credit = bid[lo] - ask[hi] - (k[hi] - k[lo])
+        edge = _pct_edge_array(credit, ask[hi])
+        leg_pairs = [
+            (Leg(a, "sell", pa), Leg(b, "buy", pb))
+            for a, b, pa, pb in zip(k_lo, k_hi, bid[lo].tolist(), ask[hi].tolist())
+        ]
+    else:
+        credit = bid[hi] - ask[lo]
+        edge = _pct_edge_array(credit, ask[lo])
+        leg_pairs = [
+            (Leg(a, "buy", pa), Leg(b, "sell", pb))
+            for a, b, pa, pb in zip(k_lo, k_hi, ask[lo].tolist(), bid[hi].tolist())
+        ]
+    return [
+        ArbitrageOpportunity(kind, e, l, c, g)
+        for e, l, c, g in zip(exp, leg_pairs, credit.tolist(), edge.tolist())
+    ]
+
+
+def _scan_cross_expiry(
+    expiry: np.ndarray,
+    k: np.ndarray,
+    bid: np.ndarray,
+    ask: np.ndarray,
+    min_edge: float,
+    min_abs_profit: float,
+) -> list[ArbitrageOpportunity]:
+    """Calendar and diagonal checks between neighbouring expiries.
+
+    Each near-expiry call is joined on strike to the next expiry: exactly for
+    calendars, and to the nearest strictly lower strike for diagonals. Either
+    far call is worth at least the near one, so selling the near bid above the
+    far ask is a locked-in credit.
+    """
+    ranks = np.unique(expiry, return_inverse=True)[1]
+    quotes = pd.DataFrame({"rank": ranks, "expiry": expiry, "strike": k, "bid": bid, "ask": ask})
+    far = quotes.assign(rank=quotes["rank"] - 1)[["rank", "expiry", "strike", "ask"]]
+    far = far.rename(columns={"expiry": "far_expiry", "ask": "far_ask"})
+
+    calendar = quotes.merge(far, on=["rank", "strike"], how="inner")
+    calendar["far_strike"] = calendar["strike"]
+    diagonal = pd.merge_asof(
+        quotes.sort_values("strike", kind="mergesort"),
+        far.rename(columns={"strike": "far_strike"}).sort_values("far_strike", kind="mergesort"),
+        left_on="strike",
+        right_on="far_strike",
+        by="rank",
+        allow_exact_matches=False,
+        direction="backward",
+    ).dropna(subset=["far_ask"])
+
+    opportunities = []
+    for kind, joined in (("calendar", calendar), ("diagonal", diagonal)):
+        credit = joined["bid"].to_numpy() - joined["far_ask"].to_numpy()
+        edge = _pct_edge_array(credit, joined["far_ask"].to_numpy())
+        hit = joined.assign(credit=credit, edge=edge)[(credit > min_abs_profit) & (edge >= min_edge)]
+        hit = hit.sort_values(["expiry", "strike"], kind="mergesort")
+        opportunities.extend(
+            ArbitrageOpportunity(
+                kind, int(e),
+                (Leg(ks, "sell", b, expiry=int(e)), Leg(kf, "buy", fa, expiry=int(fe))),
+                c, g,
+            )
+            for e, ks, b, fe, kf, fa, c, g in zip(
+                hit["expiry"], hit["strike"], hit["bid"], hit["far_expiry"],
+                hit["far_strike"], hit["far_ask"], hit["credit"], hit["edge"],
+            )
+        )
+    return opportunities
+
+
+def format_opportunity(opp: ArbitrageOpportunity) -> str:
+    """The prose message detect_arbitrage used to return for `opp`."""
+    head = f"Significant {opp.title} at expiry {opp.expiry} days: "
+    if opp.kind in ("calendar", "diagonal"):
+        near, far = opp.legs
+        return head + (
+            f"Sell at bid {near.strike:.2f} exp {near.expiry}d (${near.price:.2f}), "
+            f"buy at ask {far.strike:.2f} exp {far.expiry}d (${far.price:.2f}), "
+            f"credit: ${opp.credit:.2f}, edge: {opp.edge*100:.1f}%."
+        )
+    if opp.kind == "butterfly":
+        low, mid, high = opp.legs
+        return head + (
+            f"Buy at ask {low.strike:.2f} (${low.price:.2f}) and {high.strike:.2f} (${high.price:.2f}), "
+            f"sell at bid {mid.strike:.2f} (${mid.price:.2f}), "
+            f"net credit: ${opp.credit:.2f}, "
+            f"edge: {opp.edge*100:.1f}%."
+        )
+    low, high = opp.legs
+    if opp.kind == "reverse_spread":
+        return head + (
+            f"Sell at bid {low.strike:.2f} (${low.price:.2f}), "
+            f"buy at ask {high.strike:.2f} (${high.price:.2f}), "
+            f"net credit: ${low.price - high.price:.2f} exceeds strike diff ${high.strike - low.strike:.2f}, "
+            f"edge: {opp.edge*100:.1f}%."
+        )
+    suffix = " exceeds zero lower bound" if opp.kind == "call_spread" else ""
+    return head + (
+        f"Buy at ask {low.strike:.2f} (${low.price:.2f}), "
+        f"sell at bid {high.strike:.2f} (${high.price:.2f}), "
+        f"credit: ${opp.credit:.2f}{suffix}, edge: {opp.edge*100:.1f}%."
+    )
+
 
-def _pct_edge(numerator: float, denominator: float) -> float:
-    return abs(numerator) / max(denominator, 1e-9)
+def format_arbitrage(opportunities: list[ArbitrageOpportunity]) -> list[str]:
+    if not opportunities:
+        return ["✅ No significant arbitrage opportunities detected."]
+    return [format_opportunity(opp) for opp in opportunities]
 
 
+OPPORTUNITY_COLUMNS = ["opportunity", "kind", "expiry", "credit", "edge",
+                       "leg", "leg_expiry", "strike", "side", "price", "quantity"]
+
+
+def opportunities_frame(opportunities: list[ArbitrageOpportunity]) -> pd.DataFrame:
+    """One row per leg, numbered by opportunity; suitable for Parquet/CSV output."""
+    rows = [
+        (i, opp.kind, opp.expiry, opp.credit, opp.edge, j,
+         leg.expiry if leg.expiry is not None else opp.expiry, leg.strike, leg.side, leg.price, leg.quantity)
+        for i, opp in enumerate(opportunities)
+        for j, leg in enumerate(opp.legs)
+    ]
+    return pd.DataFrame(rows, columns=OPPORTUNITY_COLUMNS)
+
+
+# Report order within an expiry: all verticals, then call/reverse spreads
+# interleaved by strike, then butterflies.
+_SECTION = {"vertical": (0, 0), "call_spread": (1, 0), "reverse_spread": (1, 1), "butterfly": (2, 0)}
+
+
+def _order_hits(hits: dict[str, np.ndarray], expiry: np.ndarray) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Flatten per-check hits and return them with their report order."""
+    kinds = [kind for kind, legs in hits.items() for _ in range(len(legs))]
+    legs = [np.pad(legs, ((0, 0), (0, 3 - legs.shape[1])), mode="edge") for legs in hits.values()]
+    legs = np.concatenate(legs) if legs else np.empty((0, 3), dtype=int)
+    section = np.array([_SECTION[kind][0] for kind in kinds], dtype=int)
+    sub = np.array([_SECTION[kind][1] for kind in kinds], dtype=int)
+    order = np.lexsort((legs[:, 2], legs[:, 1], sub, legs[:, 0], section, expiry[legs[:, 0]]))
+    return kinds, legs, order
+
+
+@timed("detect_arbitrage")
 def detect_arbitrage(
     calls: pd.DataFrame,
     spot_price: float | None = None,
@@ -15,85 +296,201 @@ def detect_arbitrage(
     q: float = 0.0,
     min_edge: float = 0.02,
     min_abs_profit: float = 0.01,
-) -> list[str]:
-    messages: list[str] = []
+    cross_expiry: bool = True,
+    butterfly_span: int = 2,
+) -> list[ArbitrageOpportunity]:
+    """Scan a call chain for static arbitrage; use format_arbitrage for text output.
 
+    Within-expiry results come first, in expiry/strike order, followed by the
+    calendar and diagonal checks when `cross_expiry` is set. `butterfly_span`
+    is the widest row distance between butterfly wings; 2 checks adjacent
+    triples only.
+    """
     if not {"bid", "ask", "strike", "days_to_expiry"}.issubset(calls.columns):
-        return ["No bid/ask data available for robust arbitrage detection."]
+        return []
 
-    calls = calls[(calls["bid"] > 0) & (calls["ask"] > 0)].copy()
+    calls = calls[(calls["bid"] > 0) & (calls["ask"] > 0)]
     if calls.empty:
-        return ["No significant arbitrage opportunities detected."]
-
-    for expiry, grp in calls.groupby("days_to_expiry"):
-        grp = grp.sort_values("strike").reset_index(drop=True)
-        k = grp["strike"].to_numpy()
-        bid = grp["bid"].to_numpy()
-        ask = grp["ask"].to_numpy()
-        n = len(k)
-
-        for i in range(n - 1):
-            credit = bid[i + 1] - ask[i]
-            if credit > min_abs_profit and _pct_edge(credit, ask[i]) >= min_edge:
-                messages.append(
-                    (
-                        f"Significant Vertical Dominance Arbitrage at expiry {int(expiry)} days: "
-                        f"Buy at ask {k[i]:.2f} (${ask[i]:.2f}), "
-                        f"sell at bid {k[i+1]:.2f} (${bid[i+1]:.2f}), "
-                        f"credit: ${credit:.2f}, edge: {_pct_edge(credit, ask[i])*100:.1f}%."
-                    )
-                )
-
-        for i in range(n - 1):
-            k1, k2 = k[i], k[i + 1]
-            spread = k2 - k1
-
-            cost_to_buy = ask[i] - bid[i + 1]
-            if cost_to_buy < -min_abs_profit and _pct_edge(cost_to_buy, ask[i]) >= min_edge:
-                messages.append(
-                    (
-                        f"Significant Call Spread Arbitrage at expiry {int(expiry)} days: "
-                        f"Buy at ask {k[i]:.2f} (${ask[i]:.2f}), "
-                        f"sell at bid {k[i+1]:.2f} (${bid[i+1]:.2f}), "
-                        f"credit: ${-cost_to_buy:.2f} exceeds zero lower bound, "
-                        f"edge: {_pct_edge(cost_to_buy, ask[i])*100:.1f}%."
-                    )
-                )
-
-            credit_to_sell = bid[i] - ask[i + 1]
-            if (
-                credit_to_sell - spread > min_abs_profit
-                and _pct_edge(credit_to_sell - spread, ask[i + 1]) >= min_edge
-            ):
-                messages.append(
-                    (
-                        f"Significant Reverse Call Spread Arbitrage at expiry {int(expiry)} days: "
-                        f"Sell at bid {k[i]:.2f} (${bid[i]:.2f}), "
-                        f"buy at ask {k[i+1]:.2f} (${ask[i+1]:.2f}), "
-                        f"net credit: ${credit_to_sell:.2f} exceeds strike diff ${spread:.2f}, "
-                        f"edge: {_pct_edge(credit_to_sell - spread, ask[i+1])*100:.1f}%."
-                    )
-                )
-
-        for i in range(1, n - 1):
-            k1, k2, k3 = k[i - 1 : i + 2]
-            if not np.isclose(k2 - k1, k3 - k2, atol=1e-8):
-                continue
-            w1 = (k3 - k2) / (k3 - k1)
-            w3 = (k2 - k1) / (k3 - k1)
-
-            lhs = bid[i]
-            rhs = w1 * ask[i - 1] + w3 * ask[i + 1]
-            excess = lhs - rhs
-            if excess > min_abs_profit and _pct_edge(excess, rhs) >= min_edge:
-                messages.append(
-                    (
-                        f"Significant Butterfly Arbitrage at expiry {int(expiry)} days: "
-                        f"Buy at ask {k1:.2f} (${ask[i-1]:.2f}) and {k3:.2f} (${ask[i+1]:.2f}), "
-                        f"sell at bid {k2:.2f} (${bid[i]:.2f}), "
-                        f"net credit: ${excess:.2f}, "
-                        f"edge: {_pct_edge(excess, rhs)*100:.1f}%."
-                    )
-                )
-
-    return messages if messages else ["✅ No significant arbitrage opportunities detected."]
+        return []
+
+    expiry, k, bid, ask = _sorted_chain(calls)
+    hits = _scan_chain(expiry, k, bid, ask, min_edge, min_abs_profit, butterfly_span)
+    cross = _scan_cross_expiry(expiry, k, bid, ask, min_edge, min_abs_profit) if cross_expiry else []
+
+    _, _, order = _order_hits(hits, expiry)
+    flat = [
+        opp
+        for kind, legs in hits.items()
+        for opp in _build_opportunities(kind, legs, expiry, k, bid, ask)
+    ]
+    return [flat[j] for j in order] + cross
+
+
+def _opportunity_key(opp: ArbitrageOpportunity) -> tuple:
+    return (opp.kind, tuple(leg.strike for leg in opp.legs))
+
+
+def _report_key(opp: ArbitrageOpportunity) -> tuple:
+    section, sub = _SECTION[opp.kind]
+    strikes = [leg.strike for leg in opp.legs]
+    strikes += strikes[-1:] * (3 - len(strikes))
+    return (opp.expiry, section, strikes[0], sub, strikes[1], strikes[2])
+
+
+class IncrementalArbitrageDetector:
+    """Within-expiry arbitrage state that is re-checked only around changed quotes.
+
+    Holds per-expiry strike/bid/ask arrays sorted by strike. `update` applies
+    (expiry, strike, bid, ask) quote changes, re-runs the vertical, spread and
+    butterfly checks only over the rows within `butterfly_span` of each
+    changed strike, and reports which opportunities opened and closed. The
+    resulting `opportunities` match detect_arbitrage(..., cross_expiry=False)
+    on the same quotes. Quotes with a non-positive bid or ask are dropped, as
+    detect_arbitrage does.
+    """
+
+    def __init__(
+        self,
+        calls: pd.DataFrame | None = None,
+        min_edge: float = 0.02,
+        min_abs_profit: float = 0.01,
+        butterfly_span: int = 2,
+    ):
+        self.min_edge = min_edge
+        self.min_abs_profit = min_abs_profit
+        self.butterfly_span = max(int(butterfly_span), 2)
+        self._chains: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._opps: dict[int, dict[tuple, ArbitrageOpportunity]] = {}
+        if calls is not None:
+            self.load(calls)
+
+    def load(self, calls: pd.DataFrame) -> list[ArbitrageOpportunity]:
+        """Replace all state with `calls` and return every opportunity found."""
+        self._chains.clear()
+        self._opps.clear()
+        calls = calls[(calls["bid"] > 0) & (calls["ask"] > 0)]
+        expiry, k, bid, ask = _sorted_chain(calls)
+        bounds = np.flatnonzero(np.diff(expiry)) + 1
+        for e, ks, bs, as_ in zip(expiry[np.r_[0, bounds]] if len(expiry) else [],
+                                  np.split(k, bounds), np.split(bid, bounds), np.split(ask, bounds)):
+            self._chains[int(e)] = (ks, bs, as_)
+            self._opps[int(e)] = {
+                _opportunity_key(opp): opp for opp in self._scan(int(e), ks, bs, as_)
+            }
+        return self.opportunities
+
+    @property
+    def opportunities(self) -> list[ArbitrageOpportunity]:
+        opps = [opp for by_key in self._opps.values() for opp in by_key.values()]
+        return sorted(opps, key=_report_key)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The current quotes in get_options_data column layout."""
+        frames = [
+            pd.DataFrame({"strike": k, "bid": bid, "ask": ask, "days_to_expiry": e})
+            for e, (k, bid, ask) in self._chains.items()
+        ]
+        if not frames:
+            return pd.DataFrame(columns=["strike", "bid", "ask", "days_to_expiry"])
+        return pd.concat(frames, ignore_index=True)
+
+    def _scan(self, expiry: int, k: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> list[ArbitrageOpportunity]:
+        if len(k) == 0:
+            return []
+        exp = np.full(len(k), expiry)
+        hits = _scan_chain(exp, k, bid, ask, self.min_edge, self.min_abs_profit, self.butterfly_span)
+        return [opp for kind, legs in hits.items() for opp in _build_opportunities(kind, legs, exp, k, bid, ask)]
+
+    def update(self, updates) -> tuple[list[ArbitrageOpportunity], list[ArbitrageOpportunity]]:
+        """Apply (expiry, strike, bid, ask) quote changes; returns (opened, closed)."""
+        by_expiry: dict[int, dict[float, tuple[float, float]]] = {}
+        for expiry, strike, bid, ask in updates:
+            by_expiry.setdefault(int(expiry), {})[float(strike)] = (float(bid), float(ask))
+
+        windows = []
+        for expiry, changes in by_expiry.items():
+            windows.extend((expiry, *w) for w in self._apply_changes(expiry, changes))
+
+        # Re-scan every affected window in one vectorized pass; each window gets
+        # its own group id so relations never span two windows.
+        slices = [(e, *self._chains[e], a, b) for e, a, b, _, _ in windows if e in self._chains]
+        found: dict[int, list[ArbitrageOpportunity]] = {}
+        if slices:
+            group = np.concatenate([np.full(b - a + 1, i) for i, (_, _, _, _, a, b) in enumerate(slices)])
+            exp = np.concatenate([np.full(b - a + 1, e) for e, _, _, _, a, b in slices])
+            k = np.concatenate([k[a:b + 1] for _, k, _, _, a, b in slices])
+            bid = np.concatenate([bid[a:b + 1] for _, _, bid, _, a, b in slices])
+            ask = np.concatenate([ask[a:b + 1] for _, _, _, ask, a, b in slices])
+            hits = _scan_chain(group, k, bid, ask, self.min_edge, self.min_abs_profit, self.butterfly_span)
+            for kind, legs in hits.items():
+                for opp in _build_opportunities(kind, legs, exp, k, bid, ask):
+                    found.setdefault(opp.expiry, []).append(opp)
+
+        opened: list[ArbitrageOpportunity] = []
+        closed: list[ArbitrageOpportunity] = []
+        for expiry in by_expiry:
+            ranges = sorted((k_lo, k_hi) for e, _, _, k_lo, k_hi in windows if e == expiry)
+            starts = np.array([r[0] for r in ranges])
+            current = self._opps.setdefault(expiry, {})
+            before = dict(current)
+            for key, opp in before.items():
+                strikes = [leg.strike for leg in opp.legs]
+                w = np.searchsorted(starts, strikes[0], side="right") - 1
+                if w >= 0 and strikes[-1] <= ranges[w][1]:
+                    del current[key]
+            for opp in found.get(expiry, []):
+                current[_opportunity_key(opp)] = opp
+            if not current:
+                self._opps.pop(expiry, None)
+            opened.extend(opp for key, opp in current.items() if key not in before)
+            closed.extend(opp for key, opp in before.items() if key not in current)
+        return sorted(opened, key=_report_key), sorted(closed, key=_report_key)
+
+    def _apply_changes(self, expiry: int, changes: dict[float, tuple[float, float]]) -> list[tuple]:
+        """Update one expiry's arrays; returns the (lo, hi, k_lo, k_hi) windows to re-check."""
+        empty = np.empty(0)
+        k, bid, ask = self._chains.get(expiry, (empty, empty, empty))
+        strikes = np.array(sorted(changes))
+        new_bid = np.array([changes[s][0] for s in strikes])
+        new_ask = np.array([changes[s][1] for s in strikes])
+        valid = (new_bid > 0) & (new_ask > 0)
+
+        pos = np.searchsorted(k, strikes)
+        exists = pos < len(k)
+        exists[exists] = k[pos[exists]] == strikes[exists]
+
+        bid, ask = bid.copy(), ask.copy()
+        keep = exists & valid
+        bid[pos[keep]] = new_bid[keep]
+        ask[pos[keep]] = new_ask[keep]
+        drop = pos[exists & ~valid]
+        k, bid, ask = np.delete(k, drop), np.delete(bid, drop), np.delete(ask, drop)
+        add = ~exists & valid
+        at = np.searchsorted(k, strikes[add])
+        k = np.insert(k, at, strikes[add])
+        bid = np.insert(bid, at, new_bid[add])
+        ask = np.insert(ask, at, new_ask[add])
+
+        if len(k):
+            self._chains[expiry] = (k, bid, ask)
+        else:
+            self._chains.pop(expiry, None)
+
+        # Every relation that touches a changed strike, or that an insertion or
+        # deletion made or broke, lies within `span` rows of it in the new array.
+        # Windows are widened in strike space to cover deleted strikes too.
+        span = self.butterfly_span
+        last = max(len(k) - 1, 0)
+        p = np.searchsorted(k, strikes)
+        lo = np.clip(p - span, 0, last)
+        hi = np.clip(p + span, 0, last)
+        windows: list[list] = []
+        for a, b, s in zip(lo.tolist(), hi.tolist(), strikes.tolist()):
+            k_lo = min(s, k[a]) if len(k) else s
+            k_hi = max(s, k[b]) if len(k) else s
+            if windows and a <= windows[-1][1] + 1:
+                w = windows[-1]
+                w[1], w[2], w[3] = max(w[1], b), min(w[2], k_lo), max(w[3], k_hi)
+            else:
+                windows.append([a, b, k_lo, k_hi])
+        return [tuple(w) for w in windows]
@@ -0,0 +1,183 @@
+"""Compute surfaces, IVs and arbitrage scans for many tickers into Parquet.
+
+    python batch.py SPY QQQ AAPL --out runs/2024-06-03
+    python batch.py --tickers-file universe.txt --out runs/nightly --workers 8
+    python batch.py SPY --out runs/offline --provider replay:snapshots/session1
+
+Each ticker is written to ``<out>/<TICKER>/`` (surface.parquet, ivs.parquet,
+arbitrage.parquet, term_structure.parquet, quality.parquet, forwards.parquet,
+timings.json) and marked done with a ``_SUCCESS`` file; re-running the same
+command skips finished tickers. ``<out>/summary.json`` records per-ticker
+status and per-stage timings for every ticker written to ``<out>``, including
+those finished by earlier runs.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from arbitrage import opportunities_frame
+from pipeline import run_pipeline
+from providers import provider_from_spec, set_provider
+
+STAGES = ("fetch", "iv", "quality", "surface", "arbitrage", "term_structure", "write")
+SUCCESS_MARKER = "_SUCCESS"
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+def _init_worker(provider_spec: str | None) -> None:
+    if provider_spec:
+        set_provider(provider_from_spec(provider_spec))
+
+
+def ticker_dir(out: Path, ticker: str) -> Path:
+    return out / ticker.replace("/", "_")
+
+
+def is_done(out: Path, ticker: str) -> bool:
+    return (ticker_dir(out, ticker) / SUCCESS_MARKER).exists()
+
+
+def process_ticker(ticker: str, out: str, rfr: float) -> dict:
+    """Run one ticker end to end; returns its summary record (never raises)."""
+    timings: dict[str, float] = {}
+    record = {"ticker": ticker, "status": "ok", "error": None, "timings": timings}
+    final = ticker_dir(Path(out), ticker)
+    staging = final.with_name(final.name + ".tmp")
+    try:
+        result = run_pipeline(ticker, rfr, timer=partial(_timed, timings))
+        expiries, strikes, matrix = result["expiries"], result["strikes"], result["surface"]
+        opportunities, forwards = result["arbitrage"], result["forwards"]
+
+        with _timed(timings, "write"):
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir(parents=True)
+            K, D = np.meshgrid(strikes, expiries, indexing="ij")
+            pd.DataFrame({
+                "days_to_expiry": D.ravel(), "strike": K.ravel(), "imp_vol": matrix.ravel(),
+            }).to_parquet(staging / "surface.parquet", index=False)
+            ivs = result["ivs"].copy()
+            ivs["expiration"] = pd.to_datetime(ivs["expiration"])
+            ivs.to_parquet(staging / "ivs.parquet", index=False)
+            arb = opportunities_frame(opportunities)
+            arb.insert(0, "ticker", ticker)
+            arb.to_parquet(staging / "arbitrage.parquet", index=False)
+            result["term_structure"].to_parquet(staging / "term_structure.parquet", index=False)
+            result["quality"].to_parquet(staging / "quality.parquet", index=False)
+            if forwards is not None:
+                forwards.reset_index().to_parquet(staging / "forwards.parquet", index=False)
+
+        record.update(spot_price=float(result["spot_price"]), options=len(ivs),
+                      surface_shape=list(matrix.shape), opportunities=len(opportunities))
+        (staging / "timings.json").write_text(json.dumps(record, indent=2))
+        shutil.rmtree(final, ignore_errors=True)
+        staging.rename(final)
+        (final / SUCCESS_MARKER).touch()
+    except Exception as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        record.update(status=getattr(e, "status", "Error"), error=f"{type(e).__name__}: {e}")
+    return record
+
+
+def previous_records(out: Path) -> list[dict]:
+    """Per-ticker records from an earlier run's summary.json, or [] if there is none."""
+    try:
+        return json.loads((out / "summary.json").read_text()).get("tickers", [])
+    except (OSError, ValueError):
+        return []
+
+
+def summarize(records: list[dict], wall_time: float, skipped: list[str]) -> dict:
+    frame = pd.DataFrame([r["timings"] for r in records], columns=list(STAGES))
+    stages = {
+        stage: {"total_s": float(col.sum()), "mean_s": float(col.mean()), "max_s": float(col.max())}
+        for stage, col in frame.items() if col.notna().any()
+    }
+    return {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "wall_time_s": wall_time,
+        "processed": len(records),
+        "succeeded": sum(r["status"] == "ok" for r in records),
+        "failed": sorted(r["ticker"] for r in records if r["status"] != "ok"),
+        "skipped": sorted(skipped),
+        "stages": stages,
+        "tickers": records,
+    }
+
+
+def run_batch(tickers: list[str], out: str | os.PathLike, rfr: float = 0.04725, workers: int | None = None,
+              provider_spec: str | None = None, force: bool = False) -> dict:
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    skipped = [] if force else [t for t in tickers if is_done(out, t)]
+    pending = [t for t in tickers if t not in skipped]
+
+    start = time.perf_counter()
+    records = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(provider_spec,)) as pool:
+            futures = {pool.submit(process_ticker, t, str(out), rfr): t for t in pending}
+            for future in as_completed(futures):
+                record = future.result()
+                records.append(record)
+                detail = record["error"] or f"{sum(record['timings'].values()):.2f}s"
+                print(f"[{len(records)}/{len(pending)}] {record['ticker']}: {record['status']} ({detail})")
+
+    # Keep earlier records for tickers this run did not recompute, so a resumed
+    # run describes the whole output directory rather than just its own work.
+    merged = {r["ticker"]: r for r in previous_records(out)}
+    merged.update((r["ticker"], r) for r in records)
+    summary = summarize(list(merged.values()), time.perf_counter() - start, skipped)
+    (out / "summary.json").write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tickers", nargs="*", help="ticker symbols")
+    parser.add_argument("--tickers-file", help="file with one ticker per line")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--rfr", type=float, default=4.725, help="risk-free rate in percent (default 4.725)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--provider", default=os.environ.get("VOLSURF_PROVIDER"),
+                        help='market data provider, e.g. "replay:<dir>" (default: $VOLSURF_PROVIDER)')
+    parser.add_argument("--force", action="store_true", help="recompute tickers that are already done")
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        lines = Path(args.tickers_file).read_text().splitlines()
+        tickers += [line.split("#")[0].strip() for line in lines if line.split("#")[0].strip()]
+    if not tickers:
+        parser.error("no tickers given")
+
+    summary = run_batch(tickers, args.out, rfr=args.rfr / 100.0, workers=args.workers,
+                        provider_spec=args.provider, force=args.force)
+    print(f"{summary['succeeded']}/{summary['processed']} succeeded, {len(summary['skipped'])} skipped "
+          f"in {summary['wall_time_s']:.1f}s; summary at {Path(args.out) / 'summary.json'}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
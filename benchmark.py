@@ -0,0 +1,238 @@
+"""Time every pipeline stage on fixed-seed synthetic chains.
+
+    python benchmark.py --out bench/baseline.json
+    python benchmark.py --out bench/new.json --baseline bench/baseline.json --threshold 1.25
+
+Results are written as JSON ({stage: {size: seconds}}); with --baseline, any
+stage slower than threshold x baseline is reported and the exit code is 1.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import griddata
+from scipy.ndimage import gaussian_filter
+
+from arbitrage import detect_arbitrage
+from black_scholes import TRADING_DAYS
+from cache import market_cache
+from providers import MarketDataProvider, OptionChain, set_provider
+from forwards import implied_forwards
+from interpolation import benchmark_interpolation
+from quality import quality_report
+from synthetic import generate_chain, put_chain
+from volatility_calc import (
+    calculate_term_structure_iv,
+    implied_volatility,
+    implied_volatility_batch,
+    validate_implied_volatility,
+)
+
+SIZES = (100, 1_000, 10_000, 100_000)
+SEED = 7
+SPOT = 100.0
+RATE = 0.045
+AS_OF = date(2024, 1, 2)
+
+# The scalar solver is timed on at most this many options and scaled up.
+SCALAR_SAMPLE = 500
+# Stages faster than this are too noisy to flag as regressions.
+NOISE_FLOOR = 1e-3
+
+
+def synthetic_chain(n_options: int, seed: int = SEED, spot: float = SPOT) -> pd.DataFrame:
+    """generate_chain output with the imp_vol/market columns that IV computation adds."""
+    calls = generate_chain(n_options, spot=spot, rate=RATE, as_of=AS_OF, seed=seed)
+    calls["imp_vol"] = implied_volatility_batch(
+        calls["ask"].to_numpy(), spot, calls["strike"].to_numpy(), calls["days_to_expiry"].to_numpy() / TRADING_DAYS, RATE
+    )
+    calls["spot_price"] = spot
+    calls["dividend_yield"] = 0.0
+    calls["risk_free_rate"] = RATE
+    return calls
+
+
+def _by_expiry(chain: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    return {
+        exp.isoformat(): group[["strike", "bid", "ask", "volume"]].reset_index(drop=True)
+        for exp, group in chain.groupby("expiration")
+    }
+
+
+class _ChainTicker:
+    def __init__(self, calls: pd.DataFrame, puts: pd.DataFrame, spot: float):
+        self._calls = _by_expiry(calls)
+        self._puts = _by_expiry(puts)
+        self.options = tuple(sorted(self._calls))
+        self.fast_info = {"last_price": spot, "dividend_yield": 0.0}
+
+    def option_chain(self, expiration: str) -> OptionChain:
+        return OptionChain(self._calls[expiration], self._puts.get(expiration, pd.DataFrame()))
+
+    def history(self, period: str = "1d", **kwargs) -> pd.DataFrame:
+        return pd.DataFrame({"Close": [RATE * 100.0]}, index=pd.to_datetime([AS_OF]))
+
+
+class StubProvider(MarketDataProvider):
+    """Serves one in-memory chain for every symbol, so end-to-end runs need no network.
+
+    Without `puts`, a put chain is derived from the calls by put-call parity
+    so the implied-forward and OTM-merge paths run too.
+    """
+
+    def __init__(self, calls: pd.DataFrame, spot: float = SPOT, puts: pd.DataFrame | None = None):
+        if puts is None:
+            puts = put_chain(calls, spot, RATE)
+        self._ticker = _ChainTicker(calls, puts, spot)
+
+    def ticker(self, symbol: str) -> _ChainTicker:
+        return self._ticker
+
+    def today(self) -> date:
+        return AS_OF
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _griddata_surface(calls: pd.DataFrame) -> np.ndarray:
+    """The original dashboard interpolation: cubic griddata, min fill, gaussian blur."""
+    calls = calls.dropna(subset=["imp_vol"])
+    expiries = np.sort(calls["days_to_expiry"].unique())
+    strikes = np.linspace(calls["strike"].min(), calls["strike"].max(), 120)
+    grid_x, grid_y = np.meshgrid(expiries, strikes)
+    matrix = griddata(calls[["days_to_expiry", "strike"]].values, calls["imp_vol"].values, (grid_x, grid_y), method="cubic")
+    matrix = np.where(np.isnan(matrix), np.nanmin(matrix), matrix)
+    return gaussian_filter(matrix, sigma=2.0)
+
+
+def bench_size(n_options: int, repeat: int = 3, seed: int = SEED) -> dict[str, float]:
+    import app
+    import pipeline
+
+    calls = synthetic_chain(n_options, seed)
+    puts = put_chain(calls, SPOT, RATE, seed=seed)
+    price = calls["ask"].to_numpy()
+    K = calls["strike"].to_numpy()
+    T = calls["days_to_expiry"].to_numpy() / TRADING_DAYS
+    results = {}
+
+    sample = min(len(calls), SCALAR_SAMPLE)
+    scalar = _best_of(lambda: [implied_volatility(price[i], SPOT, K[i], T[i], RATE) for i in range(sample)], 1)
+    results["iv_scalar"] = scalar * len(calls) / sample
+    results["iv_batch"] = _best_of(lambda: implied_volatility_batch(price, SPOT, K, T, RATE), repeat)
+    results["detect_arbitrage"] = _best_of(lambda: detect_arbitrage(calls, SPOT, r=RATE), repeat)
+    results["validate_implied_volatility"] = _best_of(lambda: validate_implied_volatility(calls), repeat)
+    results["implied_forwards"] = _best_of(lambda: implied_forwards(calls, puts, SPOT), repeat)
+    results["quality_report"] = _best_of(lambda: quality_report(calls), repeat)
+    results["calculate_term_structure_iv"] = _best_of(lambda: calculate_term_structure_iv(calls, SPOT), repeat)
+    results["griddata_gaussian"] = _best_of(lambda: _griddata_surface(calls), repeat)
+
+    surface_calls = pipeline.surface_inputs(calls, SPOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expiries, strikes, matrix = pipeline.build_surface("BENCH", surface_calls, SPOT)
+    result = {"spot_price": SPOT, "expiries": expiries, "strikes": strikes, "surface": matrix}
+
+    # Refreshes of the same lattice with and without the triangulation cache.
+    interp = benchmark_interpolation(surface_calls[["days_to_expiry", "strike"]].to_numpy(dtype=float),
+                                     surface_calls["imp_vol"].to_numpy(), tuple(np.meshgrid(expiries, strikes)),
+                                     repeats=repeat, seed=seed)
+    results["interpolation_uncached"] = interp["uncached_s"]
+    results["interpolation_cached_cold"] = interp["cached_cold_s"]
+    results["interpolation_cached"] = interp["cached_s"]
+    results["build_surface_figure"] = _best_of(lambda: app.build_surface_figure(result, True, "strike"), repeat)
+
+    set_provider(StubProvider(calls, puts=puts))
+    try:
+        def end_to_end():
+            pipeline.surface_cache.clear()
+            market_cache.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                out = app.update_surface(1, True, "BENCH", 4.5, "strike")
+            if not out[2].startswith("Ready"):
+                raise RuntimeError(f"update_surface failed: {out[1]}")
+
+        results["update_surface"] = _best_of(end_to_end, repeat)
+    finally:
+        set_provider(None)
+    return results
+
+
+def run(sizes=SIZES, repeat: int = 3, seed: int = SEED) -> dict:
+    stages: dict[str, dict[str, float]] = {}
+    for n in sizes:
+        for stage, seconds in bench_size(n, repeat, seed).items():
+            stages.setdefault(stage, {})[str(n)] = seconds
+            print(f"{stage:>30} n={n:<7} {seconds * 1000:10.2f} ms")
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": stages,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 1.25, noise_floor: float = NOISE_FLOOR) -> list[dict]:
+    """Stages/sizes where current > threshold x baseline (ignoring sub-noise-floor timings)."""
+    regressions = []
+    for stage, sizes in current["results"].items():
+        for size, seconds in sizes.items():
+            base = baseline["results"].get(stage, {}).get(size)
+            if base is None or max(seconds, base) < noise_floor:
+                continue
+            if seconds > threshold * base:
+                regressions.append({"stage": stage, "size": int(size), "baseline_s": base,
+                                    "current_s": seconds, "ratio": seconds / base})
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="chain sizes (options)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the best is kept")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown ratio (default 1.25)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.seed)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(json.loads(Path(args.baseline).read_text()), results, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} n={r['size']}: {r['baseline_s'] * 1000:.2f} ms -> "
+                  f"{r['current_s'] * 1000:.2f} ms ({r['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.2f}x baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
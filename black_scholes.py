@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+from scipy.special import ndtr
+
+_INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+# Day count for every maturity in the app: T = days_to_expiry / TRADING_DAYS.
+TRADING_DAYS = 252.0
+
+GREEKS = ("price", "delta", "gamma", "vega", "theta", "vanna", "volga")
+
+
+def _norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+
+def call_price_vega_volga(
+    disc_S: np.ndarray,
+    disc_K: np.ndarray,
+    sqrtT: np.ndarray,
+    vol: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Call price, vega and volga from discounted spot/strike; used by the IV solver."""
+    vol_sqrtT = vol * sqrtT
+    d1 = (np.log(disc_S / disc_K) + 0.5 * vol_sqrtT**2) / vol_sqrtT
+    d2 = d1 - vol_sqrtT
+    price = disc_S * ndtr(d1) - disc_K * ndtr(d2)
+    vega = disc_S * _norm_pdf(d1) * sqrtT
+    volga = vega * d1 * d2 / vol
+    return price, vega, volga
+
+
+def black_scholes_call(S, K, T, r, q, vol) -> dict[str, np.ndarray]:
+    """Broadcasting Black-Scholes call price and Greeks.
+
+    Mirrors volatility_calc.call_price_black_scholes, including its expired
+    (T <= 0) and zero-vol (vol < 1e-12) branches, which are applied as masks.
+    Theta is -dV/dT per year; vega, vanna and volga are per unit of vol.
+    """
+    S, K, T, r, q, vol = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S, K, T, r, q, vol))
+    )
+    expired = T <= 0
+    flat = ~expired & (vol < 1e-12)
+    live = ~expired & ~flat
+
+    with np.errstate(all="ignore"):
+        T_live = np.where(live, T, 1.0)
+        vol_live = np.where(live, vol, 1.0)
+        sqrtT = np.sqrt(T_live)
+        vol_sqrtT = vol_live * sqrtT
+        df_q = np.exp(-q * T)
+        df_r = np.exp(-r * T)
+        disc_S = S * df_q
+        disc_K = K * df_r
+
+        d1 = (np.log(S / K) + (r - q + 0.5 * vol_live**2) * T_live) / vol_sqrtT
+        d2 = d1 - vol_sqrtT
+        Nd1 = ndtr(d1)
+        Nd2 = ndtr(d2)
+        nd1 = _norm_pdf(d1)
+
+        price = disc_S * Nd1 - disc_K * Nd2
+        delta = df_q * Nd1
+        gamma = df_q * nd1 / (S * vol_sqrtT)
+        vega = disc_S * nd1 * sqrtT
+        theta = -disc_S * nd1 * vol_live / (2.0 * sqrtT) + q * disc_S * Nd1 - r * disc_K * Nd2
+        vanna = -df_q * nd1 * d2 / vol_live
+        volga = vega * d1 * d2 / vol_live
+
+        itm_now = S > K
+        itm_fwd = S > disc_K
+        flat_price = df_q * np.maximum(S - disc_K, 0.0)
+        flat_theta = np.where(itm_fwd, q * flat_price - r * df_q * disc_K, 0.0)
+
+    out = {
+        "price": np.where(expired, np.maximum(S - K, 0.0), np.where(flat, flat_price, price)),
+        "delta": np.where(expired, itm_now * 1.0, np.where(flat, df_q * itm_fwd, delta)),
+        "theta": np.where(expired, 0.0, np.where(flat, flat_theta, theta)),
+    }
+    for name, value in (("gamma", gamma), ("vega", vega), ("vanna", vanna), ("volga", volga)):
+        out[name] = np.where(live, value, 0.0)
+    return {name: out[name] for name in GREEKS}
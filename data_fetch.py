@@ -1,10 +1,87 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
-import yfinance as yf
-from datetime import datetime
 import numpy as np
 
-def get_options_data(ticker_symbol):
-    ticker = yf.Ticker(ticker_symbol)
+from cache import SPOT_TTL, market_cache
+from metrics import record_dropped, timed
+from providers import get_provider
+
+def _fetch_chain(ticker, exp_date_str, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            return ticker.option_chain(exp_date_str)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+def _fetch_chains(ticker, expirations, max_workers, timeout, retries, backoff):
+    """Download option chains on a bounded thread pool, keyed by expiration.
+
+    `timeout` bounds the whole download rather than each expiration: a
+    per-expiration timeout cannot interrupt a blocked worker thread, so the
+    pool would still wait on it. Expirations not finished by the deadline
+    are abandoned and reported like failed downloads, and the call returns
+    without waiting for the worker threads still stuck on them. Retries and
+    their backoff run inside the worker and count against the same deadline.
+    """
+    chains = {}
+    deadline = time.monotonic() + timeout
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        pending = {executor.submit(_fetch_chain, ticker, exp, retries, backoff): exp for exp in expirations}
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                exp_date_str = pending.pop(future)
+                try:
+                    chains[exp_date_str] = future.result()
+                except Exception as e:
+                    print(f"Warning: could not fetch data for expiration {exp_date_str}: {e}")
+        for exp_date_str in pending.values():
+            print(f"Warning: timed out fetching data for expiration {exp_date_str}")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return chains
+
+def _prepare_chain(chain_df, exp_date_str, today, ticker_symbol):
+    if chain_df is None or chain_df.empty:
+        return None
+    chain_df = chain_df.copy()
+    chain_df['expiration'] = pd.to_datetime(exp_date_str).date()
+    chain_df['days_to_expiry'] = (chain_df['expiration'] - today).apply(lambda x: x.days)
+    fetched = len(chain_df)
+    chain_df = chain_df[chain_df['days_to_expiry'] > 0]
+    record_dropped('expired', fetched - len(chain_df), ticker_symbol)
+    fetched = len(chain_df)
+    chain_df = chain_df.dropna(subset=['bid', 'ask'])
+    record_dropped('missing_quote', fetched - len(chain_df), ticker_symbol)
+    fetched = len(chain_df)
+    chain_df = chain_df[(chain_df['bid'] > 0) & (chain_df['ask'] > 0)]
+    record_dropped('zero_quote', fetched - len(chain_df), ticker_symbol)
+    return chain_df
+
+def _combine_chains(frames):
+    if not frames:
+        return pd.DataFrame(columns=['strike', 'bid', 'ask', 'expiration', 'days_to_expiry'])
+    options_data = pd.concat(frames, ignore_index=True)
+    options_data['strike'] = options_data['strike'].astype(float)
+    options_data['days_to_expiry'] = options_data['days_to_expiry'].astype(int)
+    options_data['bid'] = options_data['bid'].astype(float)
+    options_data['ask'] = options_data['ask'].astype(float)
+    options_data.sort_values(['days_to_expiry', 'strike'], inplace=True)
+    return options_data
+
+@timed("chain_fetch", ticker_arg=0)
+def get_option_chains(ticker_symbol, max_workers=8, timeout=15.0, retries=2, backoff=0.5, ticker=None):
+    """Calls and puts from the same option_chain downloads, plus the spot: (calls, puts, spot)."""
+    provider = get_provider()
+    if ticker is None:
+        ticker = provider.ticker(ticker_symbol)
     try:
         expirations = ticker.options
     except Exception as e:
@@ -13,33 +90,27 @@ def get_options_data(ticker_symbol):
         raise RuntimeError(f"No options data found for ticker {ticker_symbol}")
     
     all_calls = []
-    today = datetime.today().date()
+    all_puts = []
+    today = provider.today()
     
+    chains = _fetch_chains(ticker, expirations, max_workers, timeout, retries, backoff)
     for exp_date_str in expirations:
-        try:
-            opt_chain = ticker.option_chain(exp_date_str)
-        except Exception as e:
-            print(f"Warning: could not fetch data for expiration {exp_date_str}: {e}")
+        opt_chain = chains.get(exp_date_str)
+        if opt_chain is None:
             continue
-        calls_df = opt_chain.calls.copy()
-        if calls_df is None or calls_df.empty:
+        calls_df = _prepare_chain(opt_chain.calls, exp_date_str, today, ticker_symbol)
+        if calls_df is None:
             continue
-        calls_df['expiration'] = pd.to_datetime(exp_date_str).date()
-        calls_df['days_to_expiry'] = (calls_df['expiration'] - today).apply(lambda x: x.days)
-        calls_df = calls_df[calls_df['days_to_expiry'] > 0]
-        calls_df = calls_df.dropna(subset=['bid', 'ask'])
-        calls_df = calls_df[(calls_df['bid'] > 0) & (calls_df['ask'] > 0)]
         all_calls.append(calls_df)
+        puts_df = _prepare_chain(getattr(opt_chain, 'puts', None), exp_date_str, today, ticker_symbol)
+        if puts_df is not None:
+            all_puts.append(puts_df)
     
     if not all_calls:
         raise RuntimeError(f"Unable to fetch any options data for {ticker_symbol}")
     
-    options_data = pd.concat(all_calls, ignore_index=True)
-    options_data['strike'] = options_data['strike'].astype(float)
-    options_data['days_to_expiry'] = options_data['days_to_expiry'].astype(int)
-    options_data['bid'] = options_data['bid'].astype(float)
-    options_data['ask'] = options_data['ask'].astype(float)
-    options_data.sort_values(['days_to_expiry', 'strike'], inplace=True)
+    options_data = _combine_chains(all_calls)
+    puts_data = _combine_chains(all_puts)
     spot_price = None
     try:
         info = ticker.fast_info
@@ -56,5 +127,11 @@ def get_options_data(ticker_symbol):
             spot_price = atm_strike
         except:
             spot_price = 100.0
+    else:
+        market_cache.set(('spot_price', ticker_symbol), float(spot_price), ttl=SPOT_TTL)
     
-    return options_data, float(spot_price)
+    return options_data, puts_data, float(spot_price)
+
+def get_options_data(ticker_symbol, max_workers=8, timeout=15.0, retries=2, backoff=0.5, ticker=None):
+    calls, _, spot_price = get_option_chains(ticker_symbol, max_workers, timeout, retries, backoff, ticker)
+    return calls, spot_price
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from black_scholes import TRADING_DAYS
+
+FORWARD_COLUMNS = [
+    "forward", "discount_factor", "rate", "dividend_yield", "rate_error", "points", "residual_scale", "fallback",
+]
+# Implied carry outside these bounds, or on expiries shorter than MIN_DAYS, is
+# not trusted: price rounding is amplified by 1/T into the implied rate.
+MIN_DAYS = 7
+RATE_RANGE = (-0.01, 0.15)
+DIVIDEND_RANGE = (-0.05, 0.15)
+# Largest standard error of the implied rate (from the parity regression) accepted.
+MAX_RATE_ERROR = 0.005
+ROUNDING = 0.005
+
+
+def _group_sums(group: np.ndarray, n: int, *values: np.ndarray) -> list[np.ndarray]:
+    return [np.bincount(group, weights=v, minlength=n) for v in values]
+
+
+def _group_median(group: np.ndarray, values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Per-group median of `values`, for `group` ids in 0..len(counts)-1."""
+    order = np.lexsort((values, group))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    sorted_values = values[order]
+    lo = starts + (np.maximum(counts, 1) - 1) // 2
+    hi = starts + np.maximum(counts, 1) // 2
+    lo, hi = np.minimum(lo, len(values) - 1), np.minimum(hi, len(values) - 1)
+    med = 0.5 * (sorted_values[lo] + sorted_values[hi]) if len(values) else np.zeros(len(counts))
+    return np.where(counts > 0, med, np.nan)
+
+
+def _weighted_lines(group, n, K, y, w):
+    """Per-group weighted least-squares intercept, slope and slope standard error of y on K."""
+    sw, swk, swy, swkk, swky = _group_sums(group, n, w, w * K, w * y, w * K * K, w * K * y)
+    det = sw * swkk - swk * swk
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(det > 0, (sw * swky - swk * swy) / det, np.nan)
+        intercept = (swy - slope * swk) / sw
+        resid = y - intercept[group] - slope[group] * K
+        counts = np.bincount(group, minlength=n)
+        variance = np.bincount(group, weights=w * resid ** 2, minlength=n) / (counts - 2)
+        # Quotes are rounded to the cent, so no fit is more certain than that rounding.
+        variance = np.maximum(variance, ROUNDING ** 2 * sw / counts)
+        slope_error = np.where(counts > 2, np.sqrt(variance * sw / det), np.nan)
+    return intercept, slope, slope_error
+
+
+def implied_forwards(calls: pd.DataFrame, puts: pd.DataFrame, spot_price: float, band: float = 0.2,
+                     min_points: int = 3, huber: float = 1.345, max_iter: int = 10) -> pd.DataFrame:
+    """Per-expiry forward and discount factor from put-call parity, C - P = DF (F - K).
+
+    Call and put mids quoted at the same strike within `band` of spot are
+    regressed as C - P = a + b K for every expiry at once (grouped sums via
+    bincount), with Huber IRLS reweighting against stale or crossed quotes
+    and base weights favouring tight spreads. Then DF = -b, F = a / DF, and
+    the implied rate and dividend yield follow on the TRADING_DAYS clock used by
+    the IV solver. Near-the-money strikes keep the early-exercise premium of
+    American options small.
+
+    Expiries whose carry is not trusted come back with NaN forward, rate and
+    dividend yield and the reason in `fallback`: "no_pairs" (no quoted
+    call/put pairs near the money), "no_fit" (fewer than `min_points` pairs
+    or a degenerate regression), "short_expiry" (under MIN_DAYS),
+    "imprecise" (rate standard error above MAX_RATE_ERROR) or "implausible"
+    (rate or dividend yield outside RATE_RANGE / DIVIDEND_RANGE). It is ""
+    for expiries whose implied carry is used.
+    """
+    quote_cols = ["days_to_expiry", "strike", "bid", "ask"]
+    pairs = calls[quote_cols].merge(puts[quote_cols], on=["days_to_expiry", "strike"], suffixes=("_c", "_p"))
+    pairs = pairs[np.abs(pairs["strike"] / spot_price - 1.0) <= band]
+    pairs = pairs[(pairs["bid_c"] > 0) & (pairs["bid_p"] > 0)]
+
+    expiries, group = np.unique(pairs["days_to_expiry"].to_numpy(), return_inverse=True)
+    n = len(expiries)
+    result = pd.DataFrame(np.nan, index=pd.Index(expiries, name="days_to_expiry"), columns=FORWARD_COLUMNS)
+    if n == 0:
+        return _with_unpaired(result, calls)
+
+    K = pairs["strike"].to_numpy(dtype=float)
+    y = 0.5 * (pairs["bid_c"] + pairs["ask_c"] - pairs["bid_p"] - pairs["ask_p"]).to_numpy()
+    spread = (pairs["ask_c"] - pairs["bid_c"] + pairs["ask_p"] - pairs["bid_p"]).to_numpy()
+    base = 1.0 / np.maximum(spread, 0.01)
+    counts = np.bincount(group, minlength=n)
+
+    w = base
+    intercept, slope, slope_error = _weighted_lines(group, n, K, y, w)
+    scale = np.full(n, np.nan)
+    for _ in range(max_iter):
+        resid = y - intercept[group] - slope[group] * K
+        scale = 1.4826 * _group_median(group, np.abs(resid), counts)
+        cutoff = huber * np.maximum(scale, 1e-4)[group]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = base * np.minimum(1.0, cutoff / np.abs(resid))
+        new_intercept, new_slope, slope_error = _weighted_lines(group, n, K, y, w)
+        converged = np.allclose(new_slope, slope, rtol=0, atol=1e-10, equal_nan=True)
+        intercept, slope = new_intercept, new_slope
+        if converged:
+            break
+
+    T = expiries / TRADING_DAYS
+    df = -slope
+    with np.errstate(divide="ignore", invalid="ignore"):
+        forward = intercept / df
+        rate = -np.log(df) / T
+        dividend_yield = rate - np.log(forward / spot_price) / T
+        rate_error = slope_error / (df * T)
+    fitted = (counts >= min_points) & (df > 0.5) & (df <= 1.05) & (forward > 0) & np.isfinite(forward)
+    plausible = (
+        (rate >= RATE_RANGE[0]) & (rate <= RATE_RANGE[1])
+        & (dividend_yield >= DIVIDEND_RANGE[0]) & (dividend_yield <= DIVIDEND_RANGE[1])
+    )
+    fallback = np.select(
+        [~fitted, expiries < MIN_DAYS, ~(rate_error <= MAX_RATE_ERROR), ~plausible],
+        ["no_fit", "short_expiry", "imprecise", "implausible"],
+        "",
+    )
+    ok = fallback == ""
+    result["forward"] = np.where(ok, forward, np.nan)
+    result["discount_factor"] = np.where(ok, df, np.nan)
+    result["rate"] = np.where(ok, rate, np.nan)
+    result["dividend_yield"] = np.where(ok, dividend_yield, np.nan)
+    result["rate_error"] = rate_error
+    result["points"] = counts
+    result["residual_scale"] = np.where(ok, scale, np.nan)
+    result["fallback"] = fallback
+    return _with_unpaired(result, calls)
+
+
+def _with_unpaired(result: pd.DataFrame, calls: pd.DataFrame) -> pd.DataFrame:
+    """Add call expiries that had no call/put pairs, marked as falling back."""
+    expiries = np.union1d(result.index.to_numpy(), calls["days_to_expiry"].unique())
+    result = result.reindex(pd.Index(expiries, name="days_to_expiry"))
+    result["points"] = result["points"].fillna(0).astype(int)
+    result["fallback"] = result["fallback"].fillna("no_pairs")
+    return result
+
+
+def fallback_expiries(forwards: pd.DataFrame | None) -> dict[str, list[int]]:
+    """{reason: [days_to_expiry, ...]} for expiries that use the quoted carry instead."""
+    if forwards is None:
+        return {}
+    flagged = forwards[forwards["fallback"] != ""]
+    return {reason: group.index.tolist() for reason, group in flagged.groupby("fallback")}
+
+
+def carry_for(days_to_expiry, forwards: pd.DataFrame | None) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row (rate, dividend_yield) from `implied_forwards`; NaN where no forward is known."""
+    days = np.asarray(days_to_expiry)
+    if forwards is None:
+        return np.full(days.shape, np.nan), np.full(days.shape, np.nan)
+    aligned = forwards[["rate", "dividend_yield"]].reindex(days)
+    return aligned["rate"].to_numpy(dtype=float), aligned["dividend_yield"].to_numpy(dtype=float)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; chosen to separate sub-millisecond vectorized stages from network fetches.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_ticker: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_ticker", default="")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[int]:
+        out, total = [], 0
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by name and label set."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._help: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def snapshot(self) -> dict:
+        """Plain-dict copy: counters as values, histograms as {count, sum, buckets}."""
+        with self._lock:
+            return {
+                "counters": {name: {key: v for key, v in series.items()} for name, series in self._counters.items()},
+                "histograms": {
+                    name: {key: {"count": h.count, "sum": h.sum, "buckets": dict(zip(h.buckets, h.cumulative()))}
+                           for key, h in series.items()}
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    for bound, cumulative in zip(hist.buckets, hist.cumulative()):
+                        lines.append(f"{name}_bucket{_labels(key + (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("volsurf_stage_seconds", "Wall time per pipeline stage and ticker.")
+registry.describe("volsurf_iv_failures_total", "Options whose implied volatility could not be solved.")
+registry.describe("volsurf_options_dropped_total", "Options removed by each filter.")
+registry.describe("volsurf_forward_fallbacks_total", "Expiries using quoted carry instead of implied forwards, by reason.")
+registry.describe("volsurf_quality_issues_total", "Options flagged by the data-quality report, by issue.")
+registry.describe("volsurf_figure_payload_bytes_total", "Encoded data-array bytes sent in surface figures.")
+
+
+def current_ticker() -> str:
+    return _current_ticker.get()
+
+
+@contextmanager
+def span(stage: str, ticker: str | None = None):
+    """Time a block into volsurf_stage_seconds{stage, ticker}.
+
+    The ticker is inherited from the enclosing span when not given, so
+    library code can record spans without knowing which ticker it serves.
+    """
+    token = _current_ticker.set(ticker) if ticker is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("volsurf_stage_seconds", time.perf_counter() - start, stage=stage, ticker=_current_ticker.get())
+        if token is not None:
+            _current_ticker.reset(token)
+
+
+def timed(stage: str, ticker_arg: int | None = None):
+    """Decorator form of `span`; `ticker_arg` names the positional argument holding the ticker."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            ticker = args[ticker_arg] if ticker_arg is not None and len(args) > ticker_arg else None
+            with span(stage, ticker):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_dropped(filter_name: str, count: int, ticker: str | None = None) -> None:
+    if count:
+        registry.inc("volsurf_options_dropped_total", count, filter=filter_name,
+                     ticker=ticker if ticker is not None else _current_ticker.get())
+
+
+def record_iv_failures(count: int, ticker: str | None = None) -> None:
+    if count:
+        registry.inc("volsurf_iv_failures_total", count,
+                     ticker=ticker if ticker is not None else _current_ticker.get())
+
+
+def record_forward_fallbacks(expiries: dict[str, list[int]], ticker: str | None = None) -> None:
+    for reason, days in expiries.items():
+        registry.inc("volsurf_forward_fallbacks_total", len(days), reason=reason,
+                     ticker=ticker if ticker is not None else _current_ticker.get())
+
+
+def record_figure_payload(nbytes: int, ticker: str | None = None) -> None:
+    registry.inc("volsurf_figure_payload_bytes_total", nbytes,
+                 ticker=ticker if ticker is not None else _current_ticker.get())
+
+
+def record_quality_issues(counts: dict[str, int], ticker: str | None = None) -> None:
+    for issue, count in counts.items():
+        if count:
+            registry.inc("volsurf_quality_issues_total", count, issue=issue,
+                         ticker=ticker if ticker is not None else _current_ticker.get())
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+
+import numpy as np
+
+# "f4" sends arrays as base64 float32 typed arrays; "json" as plain number lists.
+ENCODINGS = ("f4", "json")
+FIGURE_ENCODING = os.environ.get("VOLSURF_FIGURE_ENCODING", "f4")
+# Time figure serialization into the figure_serialize stage. Dash serializes the
+# returned figure itself, so this costs a second serialization per update.
+PROFILE_SERIALIZATION = os.environ.get("VOLSURF_FIGURE_PROFILE") == "1"
+
+MIN_GRID_POINTS = 24
+MAX_GRID_POINTS = 120
+
+
+def grid_resolution(n_unique: int, per_point: int = 2, lo: int = MIN_GRID_POINTS, hi: int = MAX_GRID_POINTS) -> int:
+    """Grid points along an axis with `n_unique` distinct quoted values."""
+    return int(np.clip(per_point * n_unique, lo, hi))
+
+
+def encode_array(values, encoding: str = FIGURE_ENCODING):
+    """Figure-ready form of `values`: a plotly.js typed-array spec or a nested list."""
+    if encoding == "json":
+        return np.asarray(values, dtype=float).tolist()
+    if encoding != "f4":
+        raise ValueError(f"Unknown figure encoding: {encoding!r}")
+    array = np.ascontiguousarray(values, dtype="<f4")
+    spec = {"dtype": "f4", "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
+    if array.ndim > 1:
+        spec["shape"] = ",".join(map(str, array.shape))
+    return spec
+
+
+def array_bytes(figure, keys: tuple[str, ...] = ("x", "y", "z")) -> int:
+    """Bytes the encoded data arrays add to a figure's JSON.
+
+    Typed arrays are measured from their base64 buffers, so nothing is
+    serialized again; plain lists (the "json" encoding) are dumped to count.
+    """
+    total = 0
+    for trace in figure.data:
+        for key in keys:
+            values = trace[key]
+            if isinstance(values, dict) and "bdata" in values:
+                total += len(values["bdata"])
+            elif values is not None:
+                total += len(json.dumps(np.asarray(values).tolist()))
+    return total
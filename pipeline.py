@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import gaussian_filter
+
+from arbitrage import detect_arbitrage
+from cache import TTLCache
+from data_fetch import get_option_chains
+from forwards import fallback_expiries, implied_forwards
+from interpolation import interpolator_cache
+from metrics import record_dropped, record_forward_fallbacks, record_quality_issues, span, timed
+from payload import grid_resolution
+from quality import ISSUE_COLUMNS, quality_report
+from surface import VolSurface, fit_surface
+from term_structure import term_structure
+from volatility_calc import (
+    calculate_implied_volatility_with_market_data,
+    merge_otm_options,
+    validate_implied_volatility,
+)
+
+SURFACE_TTL = 15 * 60.0
+
+surface_cache = TTLCache(maxsize=32, default_ttl=SURFACE_TTL)
+
+# "svi" fits a parametric surface; "griddata" interpolates the raw IVs. Cached
+# griddata is still several times faster than a warm-started SVI fit, so it is
+# the default until the fit catches up.
+SURFACE_METHOD = os.environ.get("VOLSURF_SURFACE_METHOD", "griddata")
+
+# Last fitted surface per ticker, used to warm-start the next fit.
+_previous_fits: dict[str, VolSurface] = {}
+
+_snapshot_store = None
+
+
+def get_snapshot_store():
+    """SnapshotStore rooted at $VOLSURF_SNAPSHOT_DIR, or None when history is off."""
+    global _snapshot_store
+    root = os.environ.get("VOLSURF_SNAPSHOT_DIR")
+    if _snapshot_store is None and root:
+        from snapshot_store import SnapshotStore
+
+        _snapshot_store = SnapshotStore(root)
+    return _snapshot_store
+
+
+class PipelineError(RuntimeError):
+    """Raised when a surface cannot be built; `status` is shown in the UI."""
+
+    def __init__(self, message: str, status: str = "Error"):
+        super().__init__(message)
+        self.status = status
+
+
+def _interpolated_surface(calls, unique_expiries, strike_values) -> np.ndarray:
+    points = calls[['days_to_expiry', 'strike']].values
+    values = calls['imp_vol'].values
+    grid_x, grid_y = np.meshgrid(unique_expiries, strike_values)
+
+    with span('griddata'):
+        try:
+            surface_matrix = interpolator_cache.interpolate(points, values, (grid_x, grid_y), method='cubic')
+        except Exception:
+            surface_matrix = interpolator_cache.interpolate(points, values, (grid_x, grid_y), method='linear')
+
+    if np.isnan(surface_matrix).any():
+        min_vol = np.nanmin(surface_matrix)
+        surface_matrix = np.where(np.isnan(surface_matrix), min_vol, surface_matrix)
+
+    with span('gaussian_filter'):
+        return gaussian_filter(surface_matrix, sigma=2.0)
+
+
+def _fitted_surface(ticker, calls, spot_price, unique_expiries, strike_values) -> np.ndarray | None:
+    """SVI surface evaluated on the grid, or None when the chain cannot be fitted."""
+    try:
+        with span('svi_fit'):
+            fitted = fit_surface(
+                calls,
+                spot_price,
+                rate=float(calls['risk_free_rate'].median()),
+                dividend_yield=float(calls['dividend_yield'].median()),
+                previous=_previous_fits.get(ticker),
+            )
+    except Exception as e:
+        print(f"Warning: SVI fit failed for {ticker}, interpolating instead: {e}")
+        return None
+    surface_matrix = fitted.grid(strike_values, unique_expiries)
+    if not np.isfinite(surface_matrix).all():
+        return None
+    _previous_fits[ticker] = fitted
+    return surface_matrix
+
+
+def surface_inputs(calls, spot_price):
+    """Quotes used for the surface: strikes within 50% of spot with a solved IV."""
+    lower_strike = 0.5 * spot_price
+    upper_strike = 1.5 * spot_price
+    before = len(calls)
+    calls = calls[(calls['strike'] >= lower_strike) & (calls['strike'] <= upper_strike)]
+    record_dropped('strike_range', before - len(calls))
+
+    before = len(calls)
+    calls = calls.dropna(subset=['imp_vol'])
+    record_dropped('missing_iv', before - len(calls))
+    if calls.empty:
+        raise PipelineError("Implied volatility calculation failed for all options.")
+    return calls
+
+
+@timed("build_surface", ticker_arg=0)
+def build_surface(ticker, calls, spot_price):
+    """(expiries, strikes, IV matrix) for the plotted grid, from `surface_inputs` quotes."""
+    unique_expiries = np.sort(calls['days_to_expiry'].unique())
+    min_strike = calls.groupby('days_to_expiry')['strike'].min().max()
+    max_strike = calls.groupby('days_to_expiry')['strike'].max().min()
+    quoted_strikes = calls['strike'][(calls['strike'] >= min_strike) & (calls['strike'] <= max_strike)]
+    strike_values = np.linspace(min_strike, max_strike, num=grid_resolution(quoted_strikes.nunique()))
+
+    surface_matrix = None
+    if SURFACE_METHOD == "svi":
+        surface_matrix = _fitted_surface(ticker, calls, spot_price, unique_expiries, strike_values)
+    if surface_matrix is None:
+        surface_matrix = _interpolated_surface(calls, unique_expiries, strike_values)
+    return unique_expiries, strike_values, surface_matrix
+
+
+def _snapshot_frame(calls_df, puts_df, ivs):
+    """The fetched calls and puts with their solved IV; quotes the IV filters dropped keep NaN."""
+    key = ['option_type', 'days_to_expiry', 'strike']
+    chain = pd.concat([calls_df.assign(option_type='call'),
+                       puts_df.assign(option_type='put') if not puts_df.empty else None], ignore_index=True)
+    solved = ivs[key + ['imp_vol']].drop_duplicates(key)
+    return chain.drop(columns='imp_vol', errors='ignore').merge(solved, on=key, how='left')
+
+
+def _untimed(stage: str):
+    return nullcontext()
+
+
+def run_pipeline(ticker: str, rfr: float, fetch=None, timer=_untimed, store=None) -> dict:
+    """Fetch calls and puts, compute IVs, build the OTM surface grid and detect arbitrage.
+
+    `fetch(ticker)` returns (calls, puts, spot_price) and defaults to
+    get_option_chains on the active provider. `timer(stage)` is a context
+    manager wrapped around each of the fetch, iv, quality, surface,
+    arbitrage and term_structure stages. Fetched chains are appended to
+    `store` (a SnapshotStore) when one is given.
+    """
+    fetch = fetch or get_option_chains
+    with timer('fetch'):
+        try:
+            options_df, puts_df, spot_price = fetch(ticker)
+        except Exception as e:
+            raise PipelineError(f"Error fetching data for {ticker}: {e}") from e
+
+    if options_df.empty:
+        raise PipelineError(f"No options data available for {ticker}.", status="No Data")
+
+    with timer('iv'):
+        # Per-expiry carry implied by put-call parity; expiries without a usable
+        # fit fall back to the quoted dividend yield and Treasury rate.
+        forwards = None
+        if not puts_df.empty:
+            with span('implied_forwards'):
+                forwards = implied_forwards(options_df, puts_df, spot_price)
+            record_forward_fallbacks(fallback_expiries(forwards))
+
+        calls = options_df.copy()
+        calls = calculate_implied_volatility_with_market_data(calls, ticker, forwards=forwards)
+        puts = None
+        if not puts_df.empty:
+            puts = calculate_implied_volatility_with_market_data(puts_df, ticker, option_type='put', forwards=forwards)
+
+    ivs = pd.concat([calls.assign(option_type='call'),
+                     puts.assign(option_type='put') if puts is not None else None], ignore_index=True)
+
+    if store is not None:
+        try:
+            with span('snapshot_append'):
+                store.append(ticker, _snapshot_frame(options_df, puts_df, ivs))
+        except Exception as e:
+            print(f"Warning: could not store snapshot for {ticker}: {e}")
+
+    with timer('quality'):
+        # The surface is built from OTM options on each side of the forward;
+        # arbitrage is still checked on the call chain.
+        options = merge_otm_options(calls, puts)
+        with span('quality_report'):
+            quality = quality_report(options)
+        record_quality_issues({issue: int(quality[issue].sum()) for issue in ISSUE_COLUMNS})
+        iv_issues = validate_implied_volatility(options, quality)
+        if iv_issues:
+            print("IV Calculation Issues:", iv_issues)
+
+    with timer('surface'):
+        options = surface_inputs(options, spot_price)
+        calls = surface_inputs(calls, spot_price)
+        unique_expiries, strike_values, surface_matrix = build_surface(ticker, options, spot_price)
+
+    with timer('arbitrage'):
+        arb_msgs = detect_arbitrage(calls, spot_price, r=rfr, q=0.0)
+
+    with timer('term_structure'), span('term_structure'):
+        skew = term_structure(options, spot_price)
+
+    return {
+        'ticker': ticker,
+        'spot_price': spot_price,
+        'expiries': unique_expiries,
+        'strikes': strike_values,
+        'surface': surface_matrix,
+        'calls': calls,
+        'options': options,
+        'ivs': ivs,
+        'arbitrage': arb_msgs,
+        'forwards': forwards,
+        'term_structure': skew,
+        'quality': quality,
+        'computed_at': time.time(),
+    }
+
+
+@timed("compute_surface", ticker_arg=0)
+def compute_surface(ticker: str, rfr: float) -> dict:
+    """`run_pipeline` on the active provider, storing snapshots when history is on."""
+    return run_pipeline(ticker, rfr, store=get_snapshot_store())
+
+
+def get_surface(ticker: str, rfr: float, refresh: bool = False) -> dict:
+    """Return the cached surface for (ticker, rfr), recomputing when asked or stale."""
+    key = (ticker, rfr)
+    result = None if refresh else surface_cache.get(key)
+    if result is None:
+        result = compute_surface(ticker, rfr)
+        surface_cache.set(key, result)
+    return result
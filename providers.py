@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from cache import market_cache
+
+OptionChain = namedtuple("OptionChain", ["calls", "puts"])
+
+FAST_INFO_KEYS = ("last_price", "lastPrice", "dividend_yield")
+
+
+class MarketDataProvider:
+    """Source of yfinance-shaped ticker objects used by the fetch functions.
+
+    `ticker(symbol)` must return an object exposing `options`,
+    `option_chain(expiration)`, `fast_info` and `history(period=...)` with the
+    same shapes as `yfinance.Ticker`.
+    """
+
+    def ticker(self, symbol: str):
+        raise NotImplementedError
+
+    def today(self) -> date:
+        return datetime.today().date()
+
+
+class YFinanceProvider(MarketDataProvider):
+    def ticker(self, symbol: str):
+        import yfinance as yf
+
+        return yf.Ticker(symbol)
+
+
+def _symbol_dir(root: Path, symbol: str) -> Path:
+    return root / symbol.replace("/", "_")
+
+
+def _chain_paths(root: Path, symbol: str, expiration: str) -> tuple[Path, Path]:
+    chains = _symbol_dir(root, symbol) / "chains"
+    return chains / f"{expiration}.calls.csv", chains / f"{expiration}.puts.csv"
+
+
+class _ReplayTicker:
+    def __init__(self, provider: "ReplayProvider", symbol: str):
+        self._provider = provider
+        self._symbol = symbol
+        self._dir = _symbol_dir(provider.root, symbol)
+
+    @property
+    def options(self) -> tuple[str, ...]:
+        self._provider._sleep()
+        path = self._dir / "options.json"
+        if not path.exists():
+            return ()
+        return tuple(json.loads(path.read_text()))
+
+    def option_chain(self, expiration: str) -> OptionChain:
+        self._provider._sleep()
+        calls_path, puts_path = _chain_paths(self._provider.root, self._symbol, expiration)
+        if not calls_path.exists():
+            raise FileNotFoundError(f"No recorded chain for {self._symbol} {expiration}")
+        puts = pd.read_csv(puts_path) if puts_path.exists() else pd.DataFrame()
+        return OptionChain(pd.read_csv(calls_path), puts)
+
+    @property
+    def fast_info(self) -> dict:
+        self._provider._sleep()
+        path = self._dir / "fast_info.json"
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def history(self, period: str = "1mo", **kwargs) -> pd.DataFrame:
+        self._provider._sleep()
+        path = self._dir / f"history_{period}.csv"
+        if not path.exists():
+            return pd.DataFrame()
+        return pd.read_csv(path, index_col=0)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves chains, spots and rates recorded by RecordingProvider.
+
+    `latency` seconds (plus up to `jitter` seconds, from a seeded RNG) are
+    slept on every call to stand in for network round-trips.
+    """
+
+    def __init__(self, root: str | os.PathLike, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.root = Path(root)
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        session = self.root / "session.json"
+        self._today = None
+        if session.exists():
+            self._today = date.fromisoformat(json.loads(session.read_text())["as_of"])
+
+    def _sleep(self) -> None:
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay += self._rng.uniform(0.0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def ticker(self, symbol: str) -> _ReplayTicker:
+        return _ReplayTicker(self, symbol)
+
+    def today(self) -> date:
+        return self._today or super().today()
+
+
+class _RecordingFastInfo:
+    def __init__(self, inner, path: Path, lock: threading.Lock):
+        self._inner = inner
+        self._path = path
+        self._lock = lock
+
+    def get(self, key, default=None):
+        try:
+            value = self._inner.get(key, default)
+        except Exception:
+            value = default
+        if key in FAST_INFO_KEYS:
+            with self._lock:
+                recorded = json.loads(self._path.read_text()) if self._path.exists() else {}
+                recorded[key] = None if value is None else float(value)
+                self._path.write_text(json.dumps(recorded, indent=2))
+        return value
+
+    def __getitem__(self, key):
+        return self._inner[key]
+
+
+class _RecordingTicker:
+    def __init__(self, provider: "RecordingProvider", symbol: str):
+        self._provider = provider
+        self._symbol = symbol
+        self._inner = provider.inner.ticker(symbol)
+        self._dir = _symbol_dir(provider.root, symbol)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def options(self):
+        expirations = self._inner.options
+        (self._dir / "options.json").write_text(json.dumps(list(expirations)))
+        return expirations
+
+    def option_chain(self, expiration: str):
+        chain = self._inner.option_chain(expiration)
+        calls_path, puts_path = _chain_paths(self._provider.root, self._symbol, expiration)
+        calls_path.parent.mkdir(parents=True, exist_ok=True)
+        chain.calls.to_csv(calls_path, index=False)
+        chain.puts.to_csv(puts_path, index=False)
+        return chain
+
+    @property
+    def fast_info(self) -> _RecordingFastInfo:
+        return _RecordingFastInfo(self._inner.fast_info, self._dir / "fast_info.json", self._provider._lock)
+
+    def history(self, period: str = "1mo", **kwargs) -> pd.DataFrame:
+        hist = self._inner.history(period=period, **kwargs)
+        hist.to_csv(self._dir / f"history_{period}.csv")
+        return hist
+
+
+class RecordingProvider(MarketDataProvider):
+    """Wraps another provider and writes every response under `root` for replay."""
+
+    def __init__(self, root: str | os.PathLike, inner: MarketDataProvider | None = None):
+        self.root = Path(root)
+        self.inner = inner or YFinanceProvider()
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / "session.json").write_text(
+            json.dumps({"as_of": self.inner.today().isoformat(), "recorded_at": datetime.now().isoformat()})
+        )
+
+    def ticker(self, symbol: str) -> _RecordingTicker:
+        return _RecordingTicker(self, symbol)
+
+    def today(self) -> date:
+        return self.inner.today()
+
+
+def provider_from_spec(spec: str) -> MarketDataProvider:
+    """Build a provider from "yfinance", "replay:<dir>[:<latency>]" or "record:<dir>"."""
+    kind, _, rest = spec.partition(":")
+    if kind in ("", "yfinance", "live"):
+        return YFinanceProvider()
+    if kind == "replay":
+        root, _, latency = rest.partition(":")
+        return ReplayProvider(root, latency=float(latency) if latency else 0.0)
+    if kind == "record":
+        return RecordingProvider(rest)
+    raise ValueError(f"Unknown market data provider: {spec!r}")
+
+
+_provider: MarketDataProvider | None = None
+
+
+def get_provider() -> MarketDataProvider:
+    global _provider
+    if _provider is None:
+        _provider = provider_from_spec(os.environ.get("VOLSURF_PROVIDER", "yfinance"))
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """Route all market data lookups through `provider` and drop cached values."""
+    global _provider
+    _provider = provider
+    market_cache.clear()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+IV_HIGH = 2.0
+IV_LOW = 0.01
+# A wing outlier is an IV above WING_MULTIPLE x ATM more than WING_MONEYNESS from the ATM strike.
+WING_MONEYNESS = 0.2
+WING_MULTIPLE = 3.0
+# An expiry is flagged stale when at least this share of its quotes are.
+STALE_FRACTION = 0.5
+QUALITY_COLUMNS = [
+    "days_to_expiry", "options", "missing_iv", "extreme_high", "extreme_low", "wing_outliers",
+    "spread_median", "spread_p90", "spread_max", "stale_quotes", "stale",
+]
+# Counts that flag an expiry on any nonzero value. Stale quotes are common in
+# thin wings and only flag an expiry through `stale` (STALE_FRACTION).
+FAILURE_COLUMNS = ["missing_iv", "extreme_high", "extreme_low", "wing_outliers"]
+ISSUE_COLUMNS = FAILURE_COLUMNS + ["stale_quotes"]
+
+
+def _small_keys(group: np.ndarray) -> np.ndarray:
+    # numpy's stable sort is a radix sort for 16-bit integer keys.
+    return group.astype(np.uint16) if group.max(initial=0) < 2 ** 16 else group
+
+
+def _grouped_order(values: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """Indices sorting by group, then by value (NaN last); faster than lexsort on floats."""
+    by_value = np.argsort(values)
+    return by_value[np.argsort(_small_keys(group)[by_value], kind="stable")]
+
+
+def _segment_quantile(ordered: np.ndarray, starts: np.ndarray, valid: np.ndarray, q: float) -> np.ndarray:
+    """Per-group linear-interpolated quantile of values sorted by `_grouped_order`."""
+    pos = starts + q * np.maximum(valid - 1, 0)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, starts + np.maximum(valid - 1, 0))
+    out = ordered[lo] + (pos - lo) * (ordered[hi] - ordered[lo])
+    return np.where(valid > 0, out, np.nan)
+
+
+def quality_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-expiry data-quality counts for an IV frame, in one grouped pass.
+
+    Counts missing, extreme (outside IV_LOW..IV_HIGH) and wing-outlier IVs,
+    summarizes the bid/ask spread as a fraction of mid, and counts stale
+    quotes: no traded volume, or a locked or crossed market.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=QUALITY_COLUMNS)
+    expiries, group = np.unique(df["days_to_expiry"].to_numpy(), return_inverse=True)
+    n = len(expiries)
+    counts = np.bincount(group, minlength=n)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    def per_expiry(mask: np.ndarray) -> np.ndarray:
+        return np.bincount(group, weights=mask, minlength=n).astype(int)
+
+    iv = df["imp_vol"].to_numpy(dtype=float)
+    strike = df["strike"].to_numpy(dtype=float)
+
+    # ATM = the strike nearest spot in each expiry (first row of each group by distance).
+    if "spot_price" in df:
+        distance = np.abs(strike - df["spot_price"].to_numpy(dtype=float))
+        by_group = np.argsort(_small_keys(group), kind="stable")
+        sorted_distance = distance[by_group]
+        at_min = np.flatnonzero(sorted_distance == np.minimum.reduceat(sorted_distance, starts)[group[by_group]])
+        nearest = by_group[at_min[np.searchsorted(group[by_group][at_min], np.arange(n))]]
+        atm_strike, atm_iv = strike[nearest][group], iv[nearest][group]
+        with np.errstate(invalid="ignore"):
+            wing = (np.abs(strike - atm_strike) / atm_strike > WING_MONEYNESS) & (iv > WING_MULTIPLE * atm_iv)
+    else:
+        wing = np.zeros(len(df), dtype=bool)
+
+    if "spread_pct" in df:
+        spread = df["spread_pct"].to_numpy(dtype=float)
+    elif "bid" in df and "ask" in df:
+        bid, ask = df["bid"].to_numpy(dtype=float), df["ask"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            spread = (ask - bid) / (0.5 * (ask + bid))
+    else:
+        spread = np.full(len(df), np.nan)
+    spread = np.where(np.isfinite(spread), spread, np.nan)
+    ordered_spread = spread[_grouped_order(spread, group)]
+    valid_spread = per_expiry(~np.isnan(spread))
+
+    stale = np.zeros(len(df), dtype=bool)
+    if "volume" in df:
+        volume = df["volume"].to_numpy(dtype=float)
+        stale |= ~(volume > 0)
+    if "bid" in df and "ask" in df:
+        stale |= df["bid"].to_numpy(dtype=float) >= df["ask"].to_numpy(dtype=float)
+    stale_quotes = per_expiry(stale)
+
+    with np.errstate(invalid="ignore"):
+        extreme_high, extreme_low = per_expiry(iv > IV_HIGH), per_expiry(iv < IV_LOW)
+
+    return pd.DataFrame({
+        "days_to_expiry": expiries,
+        "options": counts,
+        "missing_iv": per_expiry(np.isnan(iv)),
+        "extreme_high": extreme_high,
+        "extreme_low": extreme_low,
+        "wing_outliers": per_expiry(wing),
+        "spread_median": _segment_quantile(ordered_spread, starts, valid_spread, 0.5),
+        "spread_p90": _segment_quantile(ordered_spread, starts, valid_spread, 0.9),
+        "spread_max": _segment_quantile(ordered_spread, starts, valid_spread, 1.0),
+        "stale_quotes": stale_quotes,
+        "stale": stale_quotes >= STALE_FRACTION * counts,
+    }, columns=QUALITY_COLUMNS)
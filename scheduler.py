@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from pipeline import SURFACE_TTL, PipelineError, compute_surface, surface_cache
+from providers import get_provider
+
+DEFAULT_RFR = 0.04725
+
+
+@dataclass
+class WatchEntry:
+    ticker: str
+    rfr: float
+    next_due: float = 0.0
+    running: bool = False
+    last_success: float | None = None
+    last_error: str | None = None
+    failures: int = 0
+
+
+class RefreshScheduler:
+    """Keeps a watchlist of surfaces fresh in `surface_cache` from a background worker pool.
+
+    Each ticker is recomputed every `interval` seconds, scaled by a random
+    factor in [1 - jitter, 1 + jitter] so refreshes do not line up. At most
+    `provider_concurrency` refreshes hit the same market data provider at
+    once, however many workers there are. Failures keep the last good
+    result cached and retry on the next tick.
+    """
+
+    def __init__(self, watchlist=(), rfr: float = DEFAULT_RFR, interval: float = 60.0, jitter: float = 0.1,
+                 max_workers: int = 4, provider_concurrency: int = 2, tick: float = 1.0, seed: int | None = None):
+        self.rfr = rfr
+        self.interval = interval
+        self.jitter = jitter
+        self.max_workers = max_workers
+        self.provider_concurrency = provider_concurrency
+        self.tick = tick
+        self._rng = random.Random(seed)
+        self._entries: dict[str, WatchEntry] = {}
+        self._provider_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        for ticker in watchlist:
+            self.add(ticker)
+
+    @property
+    def watchlist(self) -> list[str]:
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def stale_after(self) -> float:
+        """Age beyond which a cached surface has missed at least one scheduled refresh."""
+        return 2.0 * self.interval * (1.0 + self.jitter)
+
+    def _delay(self) -> float:
+        return self.interval * (1.0 + self._rng.uniform(-self.jitter, self.jitter))
+
+    def add(self, ticker: str) -> None:
+        ticker = ticker.strip().upper()
+        with self._lock:
+            if ticker and ticker not in self._entries:
+                # Stagger first refreshes over the jitter window.
+                first = time.monotonic() + self._rng.uniform(0.0, self.interval * self.jitter)
+                self._entries[ticker] = WatchEntry(ticker, self.rfr, next_due=first)
+
+    def remove(self, ticker: str) -> None:
+        with self._lock:
+            self._entries.pop(ticker.strip().upper(), None)
+
+    def watches(self, ticker: str, rfr: float) -> bool:
+        with self._lock:
+            entry = self._entries.get(ticker.strip().upper())
+            return entry is not None and entry.rfr == rfr
+
+    def status(self, ticker: str) -> WatchEntry | None:
+        with self._lock:
+            return self._entries.get(ticker.strip().upper())
+
+    def _slot(self) -> threading.BoundedSemaphore:
+        name = type(get_provider()).__name__
+        with self._lock:
+            if name not in self._provider_slots:
+                self._provider_slots[name] = threading.BoundedSemaphore(self.provider_concurrency)
+            return self._provider_slots[name]
+
+    def refresh(self, ticker: str) -> dict | None:
+        """Recompute one watched ticker now and publish it; returns the result or None."""
+        entry = self.status(ticker)
+        if entry is None:
+            return None
+        try:
+            with self._slot():
+                result = compute_surface(entry.ticker, entry.rfr)
+        except PipelineError as e:
+            error = str(e)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            surface_cache.set((entry.ticker, entry.rfr), result, ttl=max(SURFACE_TTL, self.stale_after))
+            with self._lock:
+                entry.last_success, entry.last_error, entry.failures = time.time(), None, 0
+                entry.running = False
+            return result
+        print(f"Warning: scheduled refresh of {entry.ticker} failed: {error}")
+        with self._lock:
+            entry.last_error, entry.failures = error, entry.failures + 1
+            entry.running = False
+        return None
+
+    def run_pending(self) -> list[str]:
+        """Submit every ticker whose refresh is due; returns the submitted tickers."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for entry in self._entries.values():
+                if not entry.running and entry.next_due <= now:
+                    entry.running = True
+                    entry.next_due = now + self._delay()
+                    due.append(entry.ticker)
+        for ticker in due:
+            if self._executor is not None:
+                self._executor.submit(self.refresh, ticker)
+            else:
+                self.refresh(ticker)
+        return due
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.tick)
+
+    def start(self) -> "RefreshScheduler":
+        if self._thread is None:
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="surface-refresh")
+            self._thread = threading.Thread(target=self._loop, name="surface-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_scheduler: RefreshScheduler | None = None
+
+
+def get_scheduler() -> RefreshScheduler | None:
+    return _scheduler
+
+
+def start_scheduler_from_env() -> RefreshScheduler | None:
+    """Start the scheduler for $VOLSURF_WATCHLIST (comma-separated), if set.
+
+    $VOLSURF_REFRESH_INTERVAL (seconds), $VOLSURF_REFRESH_WORKERS and
+    $VOLSURF_PROVIDER_CONCURRENCY tune it.
+    """
+    global _scheduler
+    watchlist = [t for t in os.environ.get("VOLSURF_WATCHLIST", "").split(",") if t.strip()]
+    if _scheduler is None and watchlist:
+        _scheduler = RefreshScheduler(
+            watchlist,
+            interval=float(os.environ.get("VOLSURF_REFRESH_INTERVAL", 60.0)),
+            max_workers=int(os.environ.get("VOLSURF_REFRESH_WORKERS", 4)),
+            provider_concurrency=int(os.environ.get("VOLSURF_PROVIDER_CONCURRENCY", 2)),
+        ).start()
+    return _scheduler
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("strike", pa.float64()),
+    ("bid", pa.float64()),
+    ("ask", pa.float64()),
+    ("volume", pa.float64()),
+    ("expiration", pa.date32()),
+    ("days_to_expiry", pa.int32()),
+    ("option_type", pa.string()),
+    ("imp_vol", pa.float64()),
+    ("captured_at", pa.timestamp("us", tz="UTC")),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("ticker", pa.string()), ("date", pa.date32())]), flavor="hive"
+)
+
+_TS_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+
+def _utc(when) -> datetime:
+    when = pd.Timestamp(when)
+    if when.tzinfo is None:
+        when = when.tz_localize("UTC")
+    return when.tz_convert("UTC").to_pydatetime()
+
+
+class SnapshotStore:
+    """Append-only Parquet history of option chains, partitioned by ticker and capture date.
+
+    Layout is ``<root>/ticker=<T>/date=<YYYY-MM-DD>/<capture>.parquet`` with one
+    file per capture. Files are read through a memory-mapped filesystem, and
+    scans push ticker/date filters down to partition pruning and the rest
+    (captured_at, days_to_expiry) down to Parquet row-group statistics.
+    """
+
+    def __init__(self, root: str | os.PathLike, row_group_size: int = 64 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self._fs = fs.LocalFileSystem(use_mmap=True)
+        self._index: dict[str, list[tuple[datetime, Path]]] = {}
+        self._lock = threading.Lock()
+
+    def _ticker_dir(self, ticker: str) -> Path:
+        return self.root / f"ticker={ticker}"
+
+    def append(self, ticker: str, chain: pd.DataFrame, captured_at=None) -> Path:
+        """Write one captured chain; missing optional columns are stored as nulls."""
+        captured_at = _utc(captured_at if captured_at is not None else datetime.now(timezone.utc))
+        frame = pd.DataFrame(index=chain.index)
+        for field in SNAPSHOT_SCHEMA:
+            if field.name == "captured_at":
+                continue
+            frame[field.name] = chain[field.name] if field.name in chain.columns else None
+        frame["expiration"] = pd.to_datetime(frame["expiration"]).dt.date
+        frame["imp_vol"] = pd.to_numeric(frame["imp_vol"], errors="coerce")
+        frame["captured_at"] = captured_at
+        frame = frame.sort_values(["days_to_expiry", "strike", "option_type"], kind="mergesort")
+        table = pa.Table.from_pandas(frame, schema=SNAPSHOT_SCHEMA, preserve_index=False)
+
+        partition = self._ticker_dir(ticker) / f"date={captured_at.date().isoformat()}"
+        partition.mkdir(parents=True, exist_ok=True)
+        path = partition / f"{captured_at.strftime(_TS_FORMAT)}.parquet"
+        pq.write_table(table, path, row_group_size=self.row_group_size)
+
+        with self._lock:
+            if ticker in self._index:
+                keys = [ts for ts, _ in self._index[ticker]]
+                self._index[ticker].insert(bisect.bisect_right(keys, captured_at), (captured_at, path))
+        return path
+
+    def _captures(self, ticker: str) -> list[tuple[datetime, Path]]:
+        with self._lock:
+            index = self._index.get(ticker)
+            if index is None:
+                index = []
+                for path in self._ticker_dir(ticker).glob("date=*/*.parquet"):
+                    ts = datetime.strptime(path.stem, _TS_FORMAT).replace(tzinfo=timezone.utc)
+                    index.append((ts, path))
+                index.sort()
+                self._index[ticker] = index
+            return index
+
+    def captures(self, ticker: str, start=None, end=None) -> pd.DatetimeIndex:
+        """Capture timestamps for `ticker`, optionally limited to [start, end]."""
+        stamps = [ts for ts, _ in self._captures(ticker)]
+        lo = bisect.bisect_left(stamps, _utc(start)) if start is not None else 0
+        hi = bisect.bisect_right(stamps, _utc(end)) if end is not None else len(stamps)
+        return pd.DatetimeIndex(stamps[lo:hi], name="captured_at")
+
+    def as_of(self, ticker: str, when, columns: list[str] | None = None) -> pd.DataFrame | None:
+        """The most recent chain captured at or before `when`, or None."""
+        index = self._captures(ticker)
+        pos = bisect.bisect_right([ts for ts, _ in index], _utc(when))
+        if pos == 0:
+            return None
+        table = pq.read_table(index[pos - 1][1], columns=columns, memory_map=True)
+        return table.to_pandas()
+
+    def dataset(self) -> ds.Dataset:
+        return ds.dataset(
+            str(self.root),
+            schema=SNAPSHOT_SCHEMA.append(pa.field("ticker", pa.string())).append(pa.field("date", pa.date32())),
+            format="parquet",
+            partitioning=PARTITIONING,
+            filesystem=self._fs,
+        )
+
+    def _filter(self, ticker, start, end, min_dte, max_dte):
+        conditions = []
+        if ticker is not None:
+            tickers = [ticker] if isinstance(ticker, str) else list(ticker)
+            conditions.append(ds.field("ticker").isin(tickers))
+        if start is not None:
+            start = _utc(start)
+            conditions.append(ds.field("date") >= pa.scalar(start.date(), pa.date32()))
+            conditions.append(ds.field("captured_at") >= pa.scalar(start, SNAPSHOT_SCHEMA.field("captured_at").type))
+        if end is not None:
+            end = _utc(end)
+            conditions.append(ds.field("date") <= pa.scalar(end.date(), pa.date32()))
+            conditions.append(ds.field("captured_at") <= pa.scalar(end, SNAPSHOT_SCHEMA.field("captured_at").type))
+        if min_dte is not None:
+            conditions.append(ds.field("days_to_expiry") >= min_dte)
+        if max_dte is not None:
+            conditions.append(ds.field("days_to_expiry") <= max_dte)
+        expr = None
+        for condition in conditions:
+            expr = condition if expr is None else expr & condition
+        return expr
+
+    def scanner(self, ticker=None, start=None, end=None, min_dte=None, max_dte=None,
+                columns: list[str] | None = None, batch_size: int = 128 * 1024) -> ds.Scanner:
+        """Projected, filtered scanner; iterate `to_batches()` to stream large ranges."""
+        return self.dataset().scanner(
+            columns=columns,
+            filter=self._filter(ticker, start, end, min_dte, max_dte),
+            batch_size=batch_size,
+        )
+
+    def scan(self, ticker=None, start=None, end=None, min_dte=None, max_dte=None,
+             columns: list[str] | None = None) -> pd.DataFrame:
+        return self.scanner(ticker, start, end, min_dte, max_dte, columns).to_table().to_pandas()
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterable
+
+import pandas as pd
+
+from arbitrage import ArbitrageOpportunity, IncrementalArbitrageDetector
+from data_fetch import get_option_chains
+from forwards import implied_forwards
+from volatility_calc import calculate_implied_volatility_with_market_data
+
+KEY = ["days_to_expiry", "strike"]
+QUOTE_COLUMNS = KEY + ["bid", "ask", "expiration"]
+
+
+@dataclass
+class QuoteBatch:
+    """Changed quotes for one ticker. Removed quotes carry bid = ask = 0.
+
+    `fetched_at` is when the snapshot behind the batch was requested; stage
+    lags are measured from it. `forwards` are the snapshot's implied forwards
+    when it came with puts.
+    """
+
+    ticker: str
+    quotes: pd.DataFrame
+    spot_price: float
+    fetched_at: float = field(default_factory=time.monotonic)
+    full_refresh: bool = False
+    forwards: pd.DataFrame | None = None
+
+
+@dataclass
+class StageMetrics:
+    processed: int = 0
+    rows: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    mean_lag: float = 0.0
+
+    def record(self, batch: QuoteBatch) -> None:
+        lag = time.monotonic() - batch.fetched_at
+        self.processed += 1
+        self.rows += len(batch.quotes)
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.mean_lag += (lag - self.mean_lag) / self.processed
+
+
+@dataclass
+class TickerState:
+    """Latest chain with implied vols, plus the incremental arbitrage state."""
+
+    chain: pd.DataFrame
+    spot_price: float
+    detector: IncrementalArbitrageDetector
+    updated_at: float = 0.0
+
+
+def _unpack(snapshot: tuple) -> tuple[pd.DataFrame, pd.DataFrame | None, float]:
+    """(calls, puts, spot_price) from a (chain, spot_price) or (calls, puts, spot_price) snapshot."""
+    if len(snapshot) == 2:
+        return snapshot[0], None, snapshot[1]
+    return snapshot
+
+
+class _DiffingSource:
+    """Turns successive full chain snapshots into QuoteBatches of changed rows.
+
+    Snapshots are (chain, spot_price) or (calls, puts, spot_price); with puts
+    each batch carries the snapshot's implied forwards.
+    """
+
+    def __init__(self, ticker: str, spot_tolerance: float = 1e-4):
+        self.ticker = ticker
+        self.spot_tolerance = spot_tolerance
+        self._previous: pd.DataFrame | None = None
+        self._spot: float | None = None
+
+    def invalidate(self) -> None:
+        """Make the next batch a full refresh, e.g. after a downstream stage lost a batch."""
+        self._spot = None
+
+    def _diff(self, snapshot: tuple, fetched_at: float) -> QuoteBatch | None:
+        chain, puts, spot_price = _unpack(snapshot)
+        current = chain[QUOTE_COLUMNS].drop_duplicates(KEY, keep="last").set_index(KEY)
+        previous = self._previous if self._previous is not None else current.iloc[0:0]
+        full_refresh = self._spot is None or abs(spot_price - self._spot) > self.spot_tolerance * self._spot
+        self._previous, self._spot = current, spot_price
+
+        joined = current.join(previous[["bid", "ask"]], how="outer", rsuffix="_prev")
+        joined[["bid", "ask"]] = joined[["bid", "ask"]].fillna(0.0)
+        changed = (joined["bid"] != joined["bid_prev"]) | (joined["ask"] != joined["ask_prev"])
+        if full_refresh:
+            # A spot move reprices every option, so every row is re-solved.
+            changed[:] = True
+        elif not changed.any():
+            return None
+        quotes = joined.loc[changed, ["bid", "ask", "expiration"]].reset_index()
+        forwards = implied_forwards(chain, puts, spot_price) if puts is not None and not puts.empty else None
+        return QuoteBatch(self.ticker, quotes, spot_price, fetched_at, full_refresh, forwards)
+
+
+class PollingQuoteSource(_DiffingSource):
+    """Polls `fetch` (get_option_chains by default) on a worker thread every `interval` seconds."""
+
+    def __init__(self, ticker: str, interval: float = 5.0,
+                 fetch: Callable[[str], tuple] = get_option_chains, **kwargs):
+        super().__init__(ticker, **kwargs)
+        self.interval = interval
+        self.fetch = fetch
+
+    async def __aiter__(self) -> AsyncIterator[QuoteBatch]:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = time.monotonic()
+            try:
+                snapshot = await loop.run_in_executor(None, self.fetch, self.ticker)
+            except Exception as e:
+                print(f"Warning: polling {self.ticker} failed: {e}")
+            else:
+                batch = self._diff(snapshot, started)
+                if batch is not None:
+                    yield batch
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0.0))
+
+
+class ReplayQuoteSource(_DiffingSource):
+    """Replays a sequence of snapshots, e.g. SnapshotStore captures split by option_type."""
+
+    def __init__(self, ticker: str, snapshots: Iterable[tuple], interval: float = 0.0, **kwargs):
+        super().__init__(ticker, **kwargs)
+        self.snapshots = snapshots
+        self.interval = interval
+
+    async def __aiter__(self) -> AsyncIterator[QuoteBatch]:
+        for snapshot in self.snapshots:
+            batch = self._diff(snapshot, time.monotonic())
+            if batch is not None:
+                yield batch
+            await asyncio.sleep(self.interval)
+
+
+class StreamingPipeline:
+    """source -> IV -> surface/arbitrage stages joined by bounded queues.
+
+    A full queue blocks the stage feeding it, so a slow consumer throttles the
+    sources instead of letting batches pile up. `metrics()` reports per-stage
+    lag, measured from when each batch's snapshot was fetched. A batch that
+    fails in a stage makes its source send a full refresh next, so the lost
+    changes are not left out of the chain.
+    """
+
+    def __init__(self, sources, queue_size: int = 8,
+                 on_update: Callable[[str, TickerState, list[ArbitrageOpportunity], list[ArbitrageOpportunity]], None] | None = None,
+                 detector_kwargs: dict | None = None):
+        self.sources = list(sources)
+        self.on_update = on_update
+        self.detector_kwargs = detector_kwargs or {}
+        self.states: dict[str, TickerState] = {}
+        self._iv_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._surface_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._stage_metrics = {name: StageMetrics() for name in ("source", "iv", "surface")}
+
+    def metrics(self) -> dict[str, dict]:
+        out = {name: vars(m).copy() for name, m in self._stage_metrics.items()}
+        out["iv"]["queue_depth"] = self._iv_queue.qsize()
+        out["surface"]["queue_depth"] = self._surface_queue.qsize()
+        return out
+
+    async def _produce(self, source) -> None:
+        async for batch in source:
+            self._stage_metrics["source"].record(batch)
+            await self._iv_queue.put(batch)
+
+    def _invalidate(self, ticker: str) -> None:
+        for source in self.sources:
+            if source.ticker == ticker:
+                source.invalidate()
+
+    async def _iv_stage(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._iv_queue.get()
+            try:
+                batch.quotes = await loop.run_in_executor(None, self._solve_iv, batch)
+                self._stage_metrics["iv"].record(batch)
+                await self._surface_queue.put(batch)
+            except Exception as e:
+                print(f"Warning: IV stage failed for {batch.ticker}: {e}")
+                self._invalidate(batch.ticker)
+            finally:
+                self._iv_queue.task_done()
+
+    @staticmethod
+    def _solve_iv(batch: QuoteBatch) -> pd.DataFrame:
+        """IVs through the batch pipeline's solver, so its filters and implied carry apply.
+
+        Quotes the spread and deep-ITM filters drop are passed on as removed,
+        as the batch pipeline leaves them out of the surface and arbitrage scan.
+        """
+        quotes = batch.quotes
+        live = quotes[(quotes["bid"] > 0) & (quotes["ask"] > 0)]
+        solved = calculate_implied_volatility_with_market_data(
+            live, batch.ticker, forwards=batch.forwards, spot_price=batch.spot_price,
+        )
+        kept = quotes.set_index(KEY).index.isin(solved.set_index(KEY).index)
+        return pd.concat([solved, quotes[~kept].assign(bid=0.0, ask=0.0)], ignore_index=True)
+
+    async def _surface_stage(self) -> None:
+        while True:
+            batch = await self._surface_queue.get()
+            try:
+                opened, closed = self._apply(batch)
+                self._stage_metrics["surface"].record(batch)
+                if self.on_update is not None:
+                    self.on_update(batch.ticker, self.states[batch.ticker], opened, closed)
+            except Exception as e:
+                print(f"Warning: surface stage failed for {batch.ticker}: {e}")
+                self._invalidate(batch.ticker)
+            finally:
+                self._surface_queue.task_done()
+
+    def _apply(self, batch: QuoteBatch):
+        state = self.states.get(batch.ticker)
+        if state is None:
+            detector = IncrementalArbitrageDetector(**self.detector_kwargs)
+            state = self.states[batch.ticker] = TickerState(batch.quotes.iloc[0:0], batch.spot_price, detector)
+
+        chain = state.chain.set_index(KEY)
+        updates = batch.quotes.set_index(KEY)
+        if batch.full_refresh:
+            # A full refresh restates the chain, so quotes it leaves out are gone,
+            # including ones whose removal was in a batch lost to a failure.
+            gone = chain.index.difference(updates.index)
+            updates = pd.concat([updates, pd.DataFrame({"bid": 0.0, "ask": 0.0}, index=gone)])
+        removed = (updates["bid"] <= 0) | (updates["ask"] <= 0)
+        chain = pd.concat([chain.drop(index=chain.index.intersection(updates.index)), updates[~removed]])
+        state.chain = chain.sort_index().reset_index()
+        state.spot_price = batch.spot_price
+        state.updated_at = time.monotonic()
+
+        quotes = updates.reset_index()
+        return state.detector.update(zip(
+            quotes["days_to_expiry"].to_numpy(), quotes["strike"].to_numpy(),
+            quotes["bid"].to_numpy(), quotes["ask"].to_numpy(),
+        ))
+
+    async def run(self) -> None:
+        """Run until every source is exhausted and both queues have drained."""
+        workers = [asyncio.create_task(self._iv_stage()), asyncio.create_task(self._surface_stage())]
+        try:
+            await asyncio.gather(*(self._produce(source) for source in self.sources))
+            await self._iv_queue.join()
+            await self._surface_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import least_squares
+
+from black_scholes import TRADING_DAYS
+
+MIN_SLICE_POINTS = 5
+# Grid-search zoom rounds before the least-squares polish, without and with a previous fit.
+COLD_ROUNDS = 3
+WARM_ROUNDS = 1
+# A previous slice warm-starts the new one when their maturities are this close (years).
+WARM_MATCH = 7 / TRADING_DAYS
+
+# Coarse (m, sigma) grid used to seed a slice fit when there is no previous fit.
+_M_GRID, _SIGMA_GRID = (g.ravel() for g in np.meshgrid(np.linspace(-0.5, 0.5, 11), np.geomspace(0.01, 1.0, 9)))
+
+
+def svi_total_variance(k, a, b, rho, m, sigma):
+    """Raw SVI total implied variance w(k) = a + b (rho (k - m) + sqrt((k - m)^2 + sigma^2))."""
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x * x + sigma * sigma))
+
+
+def ssvi_total_variance(k, theta, rho, eta, gamma):
+    """SSVI total variance with the power-law phi(theta) = eta / (theta^gamma (1 + theta)^(1 - gamma))."""
+    phi = eta / (theta**gamma * (1.0 + theta) ** (1.0 - gamma))
+    pk = phi * k
+    return 0.5 * theta * (1.0 + rho * pk + np.sqrt((pk + rho) ** 2 + 1.0 - rho * rho))
+
+
+def _solve_linear(k: np.ndarray, w: np.ndarray, m: np.ndarray, sigma: np.ndarray):
+    """For each candidate (m, sigma), the least-squares (a, d, c) in w = a + d y + c sqrt(y^2 + 1).
+
+    All candidates are solved at once as a batch of 3x3 normal equations.
+    Returns the raw-SVI parameters and the residual sum of squares.
+    """
+    y = (k[None, :] - m[:, None]) / sigma[:, None]
+    X = np.stack([np.ones_like(y), y, np.sqrt(y * y + 1.0)], axis=-1)
+    Xt = X.transpose(0, 2, 1)
+    coef = np.linalg.solve(Xt @ X + 1e-12 * np.eye(3), Xt @ w[:, None])[..., 0]
+    a, d, c = coef.T
+    # Project onto the raw-SVI domain: b >= 0 and |rho| <= 1.
+    c = np.maximum(c, 1e-10)
+    d = np.clip(d, -c, c)
+    b = c / sigma
+    rho = d / c
+    resid = svi_total_variance(k[None, :], a[:, None], b[:, None], rho[:, None], m[:, None], sigma[:, None]) - w
+    return np.stack([a, b, rho, m, sigma], axis=1), np.einsum("jn,jn->j", resid, resid)
+
+
+def _from_free(u):
+    a, b, t, m, log_sigma = u
+    return np.array([a, b, np.tanh(t), m, np.exp(log_sigma)])
+
+
+def _free_jacobian(u, k, w):
+    a, b, t, m, log_sigma = u
+    rho, sigma = np.tanh(t), np.exp(log_sigma)
+    x = k - m
+    r = np.sqrt(x * x + sigma * sigma)
+    return np.stack([
+        np.ones_like(k), rho * x + r, b * x * (1.0 - rho * rho), -b * (rho + x / r), b * sigma * sigma / r,
+    ], axis=1)
+
+
+def _polish(k: np.ndarray, w: np.ndarray, x0: np.ndarray) -> np.ndarray:
+    """Least-squares refinement of all five raw-SVI parameters from a grid-search point.
+
+    Runs Levenberg-Marquardt on (a, b, atanh rho, m, log sigma) so rho and
+    sigma stay in range; the grid point is kept if the refinement leaves the
+    SVI domain (b < 0) or does not improve the fit.
+    """
+    a, b, rho, m, sigma = x0
+    u0 = np.array([a, b, np.arctanh(np.clip(rho, -0.999, 0.999)), m, np.log(max(sigma, 1e-4))])
+    res = least_squares(lambda u, k, w: svi_total_variance(k, *_from_free(u)) - w, u0, jac=_free_jacobian,
+                        method="lm", args=(k, w), x_scale="jac", ftol=1e-6, xtol=1e-6, max_nfev=100)
+    fitted = _from_free(res.x)
+    base = 0.5 * np.sum((svi_total_variance(k, *x0) - w) ** 2)
+    return fitted if fitted[1] >= 0 and np.isfinite(res.cost) and res.cost <= base else x0
+
+
+def fit_svi_slice(k: np.ndarray, w: np.ndarray, initial: np.ndarray | None = None, rounds: int | None = None) -> np.ndarray:
+    """Fit raw SVI (a, b, rho, m, sigma) to one expiry's log-moneyness/total-variance points.
+
+    Uses the quasi-explicit split: (a, b, rho) are solved linearly for fixed
+    (m, sigma), which are located by a vectorized grid search that is zoomed
+    in around the best candidate each round, then all five parameters are
+    polished with least squares. A previous fit (`initial`) starts the search
+    on a narrow window around its (m, sigma) and needs fewer rounds.
+    """
+    if initial is None:
+        params, sse = _solve_linear(k, w, _M_GRID, _SIGMA_GRID)
+        best = params[np.argmin(sse)]
+        m_width, log_s_width = 0.1, np.log(10.0) / 8
+        rounds = COLD_ROUNDS if rounds is None else rounds
+    else:
+        best = np.asarray(initial, dtype=float)
+        m_width, log_s_width = 0.02, 0.1
+        rounds = WARM_ROUNDS if rounds is None else rounds
+    m0, log_s0 = best[3], np.log(max(best[4], 1e-4))
+    offsets = np.linspace(-1.0, 1.0, 9)
+    for _ in range(rounds):
+        m_c, s_c = (g.ravel() for g in np.meshgrid(m0 + m_width * offsets, np.exp(log_s0 + log_s_width * offsets)))
+        params, sse = _solve_linear(k, w, m_c, s_c)
+        best = params[np.argmin(sse)]
+        m0, log_s0 = best[3], np.log(best[4])
+        m_width, log_s_width = m_width / 3, log_s_width / 3
+    return _polish(k, w, best)
+
+
+@dataclass
+class VolSurface:
+    """Fitted implied-volatility surface, evaluated in closed form on any (K, T).
+
+    Slices are stored by maturity (in years, days / TRADING_DAYS). Between slices total
+    variance is interpolated linearly in T at fixed log-forward-moneyness;
+    outside them implied volatility is held flat in T.
+    """
+
+    spot: float
+    rate: float
+    dividend_yield: float
+    expiries: np.ndarray
+    slice_params: np.ndarray
+    ssvi_params: np.ndarray | None = None
+    atm_variance: np.ndarray | None = None
+
+    def forward(self, T):
+        return self.spot * np.exp((self.rate - self.dividend_yield) * np.asarray(T, dtype=float))
+
+    def _slice_variance(self, k, idx):
+        if self.ssvi_params is not None:
+            rho, eta, gamma = self.ssvi_params
+            return ssvi_total_variance(k, self.atm_variance[idx], rho, eta, gamma)
+        a, b, rho, m, sigma = np.moveaxis(self.slice_params[idx], -1, 0)
+        return svi_total_variance(k, a, b, rho, m, sigma)
+
+    def total_variance(self, k, T):
+        k, T = np.broadcast_arrays(np.asarray(k, dtype=float), np.asarray(T, dtype=float))
+        t = self.expiries
+        hi = np.clip(np.searchsorted(t, T), 1, len(t) - 1) if len(t) > 1 else np.zeros(T.shape, dtype=int)
+        lo = np.maximum(hi - 1, 0)
+        w_lo = self._slice_variance(k, lo)
+        w_hi = self._slice_variance(k, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(t[hi] > t[lo], (T - t[lo]) / (t[hi] - t[lo]), 0.0)
+        w = w_lo + np.clip(frac, 0.0, 1.0) * (w_hi - w_lo)
+        # Flat implied volatility before the first and after the last slice.
+        w = np.where(T < t[0], w_lo * T / t[0], w)
+        w = np.where(T > t[-1], w_hi * T / t[-1], w)
+        return np.maximum(w, 1e-10)
+
+    def implied_vol(self, K, T):
+        """Implied volatility at strikes K and maturities T (years); broadcasts."""
+        K, T = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float))
+        k = np.log(K / self.forward(T))
+        return np.sqrt(self.total_variance(k, T) / T)
+
+    def grid(self, strikes, days_to_expiry) -> np.ndarray:
+        """IV matrix of shape (len(strikes), len(days_to_expiry)), as the dashboard plots it."""
+        K, D = np.meshgrid(np.asarray(strikes, dtype=float), np.asarray(days_to_expiry, dtype=float), indexing="ij")
+        return self.implied_vol(K, D / TRADING_DAYS)
+
+
+def fit_ssvi(k: np.ndarray, T: np.ndarray, w: np.ndarray, theta: np.ndarray,
+             initial: np.ndarray | None = None) -> np.ndarray:
+    """Global SSVI (rho, eta, gamma) fit given each point's ATM total variance theta."""
+    x0 = np.asarray(initial if initial is not None else [-0.5, 1.0, 0.5], dtype=float)
+    res = least_squares(
+        lambda p: ssvi_total_variance(k, theta, *p) - w,
+        x0=x0,
+        bounds=([-0.999, 1e-4, 1e-3], [0.999, 50.0, 0.999]),
+    )
+    return res.x
+
+
+def fit_surface(calls: pd.DataFrame, spot: float, rate: float, dividend_yield: float = 0.0,
+                previous: VolSurface | None = None, ssvi: bool = False) -> VolSurface:
+    """Fit per-expiry SVI slices (optionally a global SSVI) to a chain with `imp_vol`.
+
+    Slices with fewer than MIN_SLICE_POINTS quotes are skipped. When
+    `previous` is given, each slice is warm-started from the previous fit at
+    the nearest maturity within WARM_MATCH, so starts survive a day rolling over.
+    """
+    df = calls.dropna(subset=["imp_vol"])
+    df = df[df["imp_vol"] > 0]
+    T_all = df["days_to_expiry"].to_numpy(dtype=float) / TRADING_DAYS
+    k_all = np.log(df["strike"].to_numpy(dtype=float) / (spot * np.exp((rate - dividend_yield) * T_all)))
+    w_all = df["imp_vol"].to_numpy(dtype=float) ** 2 * T_all
+
+    order = np.argsort(T_all, kind="stable")
+    T_all, k_all, w_all = T_all[order], k_all[order], w_all[order]
+    expiries, starts, counts = np.unique(T_all, return_index=True, return_counts=True)
+    keep = counts >= MIN_SLICE_POINTS
+    if not keep.any():
+        raise ValueError("Not enough quotes to fit any SVI slice")
+
+    warm = [None] * len(expiries)
+    if previous is not None and previous.ssvi_params is None and len(previous.expiries):
+        nearest = np.abs(expiries[:, None] - previous.expiries[None, :]).argmin(axis=1)
+        close = np.abs(previous.expiries[nearest] - expiries) <= WARM_MATCH
+        warm = [previous.slice_params[i] if ok else None for i, ok in zip(nearest, close)]
+
+    params = []
+    for T, start, count, initial in zip(expiries[keep], starts[keep], counts[keep], np.array(warm, dtype=object)[keep]):
+        sl = slice(start, start + count)
+        params.append(fit_svi_slice(k_all[sl], w_all[sl], initial))
+    params = np.array(params)
+    surface = VolSurface(spot, rate, dividend_yield, expiries[keep], params)
+
+    if ssvi:
+        theta = np.maximum(svi_total_variance(0.0, *params.T), 1e-8)
+        in_fit = np.repeat(keep, counts)
+        theta_pts = np.repeat(theta, counts[keep])
+        initial = previous.ssvi_params if previous is not None else None
+        surface.ssvi_params = fit_ssvi(k_all[in_fit], T_all[in_fit], w_all[in_fit], theta_pts, initial)
+        surface.atm_variance = theta
+    return surface
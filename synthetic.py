@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from black_scholes import TRADING_DAYS, black_scholes_call
+from surface import svi_total_variance
+
+CHAIN_COLUMNS = ["strike", "bid", "ask", "volume", "expiration", "days_to_expiry"]
+STRIKE_REGIMES = ("uniform", "tiered", "mixed")
+ARBITRAGE_KINDS = ("vertical", "butterfly")
+
+# Listed-style strike spacing: the middle half of the strikes use the base
+# step, the next 30% 2.5x it and the outer wings 5x it.
+_TIERS = ((0.5, 1.0), (0.3, 2.5), (0.2, 5.0))
+
+
+@dataclass(frozen=True)
+class SVIParams:
+    """Raw SVI for one year of total variance; w(k, T) = T * svi(k)."""
+
+    a: float = 0.02
+    b: float = 0.12
+    rho: float = -0.4
+    m: float = 0.05
+    sigma: float = 0.2
+
+
+@dataclass(frozen=True)
+class HestonParams:
+    """SSVI with the Heston-like phi and the Heston ATM variance term structure."""
+
+    v0: float = 0.04
+    vbar: float = 0.05
+    kappa: float = 1.5
+    rho: float = -0.6
+    lam: float = 1.2
+
+
+def total_variance(k: np.ndarray, T: np.ndarray, model: SVIParams | HestonParams) -> np.ndarray:
+    if isinstance(model, SVIParams):
+        return T * svi_total_variance(k, model.a, model.b, model.rho, model.m, model.sigma)
+    theta = model.vbar * T + (model.v0 - model.vbar) * (1.0 - np.exp(-model.kappa * T)) / model.kappa
+    lt = model.lam * theta
+    phi = (1.0 - (1.0 - np.exp(-lt)) / lt) / lt
+    pk = phi * k
+    return 0.5 * theta * (1.0 + model.rho * pk + np.sqrt((pk + model.rho) ** 2 + 1.0 - model.rho ** 2))
+
+
+def expiry_days(n_expiries: int, max_days: int = 730) -> np.ndarray:
+    """Weeklies up front, then monthlies, then quarterlies/LEAPS out to `max_days`."""
+    weeklies = 7 * np.arange(1, 5)
+    monthlies = 30 * np.arange(2, 12)
+    longer = np.linspace(365, max_days, max(n_expiries, 2)).astype(int)
+    days = np.unique(np.concatenate([weeklies, monthlies, longer]))
+    days = days[days <= max_days]
+    if len(days) >= n_expiries:
+        return days[np.round(np.linspace(0, len(days) - 1, n_expiries)).astype(int)]
+    return np.concatenate([days, days[-1] + 7 * np.arange(1, n_expiries - len(days) + 1)])
+
+
+def _nice_step(raw: np.ndarray) -> np.ndarray:
+    """Round steps up to 1, 2, 2.5 or 5 times a power of ten."""
+    raw = np.maximum(raw, 1e-4)
+    scale = 10.0 ** np.floor(np.log10(raw))
+    mantissa = raw / scale
+    nice = np.select([mantissa <= 1, mantissa <= 2, mantissa <= 2.5, mantissa <= 5], [1.0, 2.0, 2.5, 5.0], 10.0)
+    return nice * scale
+
+
+def strike_grid(forward: np.ndarray, T: np.ndarray, per_expiry: int, regime: str, width: float,
+                rng: np.random.Generator) -> np.ndarray:
+    """(n_expiries, per_expiry) increasing strikes; the range widens with sqrt(T)."""
+    if regime not in STRIKE_REGIMES:
+        raise ValueError(f"Unknown strike regime: {regime!r}")
+    n_exp = len(T)
+    half_width = np.minimum(width * np.maximum(np.sqrt(T), 0.3), 0.95) * forward
+
+    j = np.arange(per_expiry)
+    centered = np.abs(j - (per_expiry - 1) / 2.0) / max(per_expiry / 2.0, 1.0)
+    bounds = np.cumsum([share for share, _ in _TIERS])
+    tier_mult = np.array([mult for _, mult in _TIERS])[np.minimum(np.searchsorted(bounds, centered), len(_TIERS) - 1)]
+    tiered = rng.random(n_exp) < 0.5 if regime == "mixed" else np.full(n_exp, regime == "tiered")
+    mult = np.where(tiered[:, None], tier_mult[None, :], 1.0)
+    mult[:, 0] = 0.0
+
+    step = _nice_step(2.0 * half_width / np.maximum(mult.sum(axis=1), 1.0))
+    offsets = np.cumsum(mult * step[:, None], axis=1)
+    atm = np.argmin(np.abs(offsets - offsets[:, -1:] / 2.0), axis=1)
+    center = np.round(forward / step) * step
+    strikes = center[:, None] + offsets - offsets[np.arange(n_exp), atm][:, None]
+    # Keep strikes positive (and increasing) when the grid would cross zero.
+    return np.maximum(strikes, step[:, None] * (1.0 + j[None, :]))
+
+
+def _tick(price: np.ndarray) -> np.ndarray:
+    return np.where(price < 3.0, 0.01, 0.05)
+
+
+def generate_chain(n_options: int = 1_000, n_expiries: int | None = None, spot: float = 100.0,
+                   rate: float = 0.045, dividend_yield: float = 0.0,
+                   model: SVIParams | HestonParams | None = None, strike_regime: str = "tiered",
+                   strike_width: float = 0.6, spread_pct: float = 0.02, wing_spread: float = 0.5,
+                   stale_fraction: float = 0.0, stale_move: float = 0.01,
+                   inject_arbitrage: int | dict[str, int] = 0, arbitrage_edge: float = 0.1,
+                   as_of: date = date(2024, 1, 2), seed: int = 0) -> pd.DataFrame:
+    """Call chain in get_options_data layout, with exactly `n_options` rows.
+
+    Prices come from `model` (SVI by default) through Black-Scholes on the
+    forward, with bid/ask spreads that widen in the wings and snap to
+    0.01/0.05 ticks. `stale_fraction` of the quotes are priced off a spot
+    `stale_move` away. `inject_arbitrage` plants vertical and butterfly
+    violations (a count split over both kinds, or {kind: count}); the planted
+    quotes are listed in ``chain.attrs["injected_arbitrage"]`` as
+    (kind, days_to_expiry, strike) tuples. Everything is vectorized over
+    the whole chain.
+    """
+    rng = np.random.default_rng(seed)
+    model = model if model is not None else SVIParams()
+    if n_expiries is None:
+        n_expiries = int(np.clip(np.sqrt(n_options / 10), 4, 60))
+    n_expiries = max(min(n_expiries, n_options // 3), 1)
+    per_expiry = -(-n_options // n_expiries)
+
+    days = expiry_days(n_expiries)
+    T_exp = days / TRADING_DAYS
+    forward = spot * np.exp((rate - dividend_yield) * T_exp)
+    K = strike_grid(forward, T_exp, per_expiry, strike_regime, strike_width, rng)
+    exp_idx = np.repeat(np.arange(n_expiries), per_expiry)[:n_options]
+    K = K.ravel()[:n_options]
+    T = T_exp[exp_idx]
+
+    S = np.full(n_options, float(spot))
+    stale = rng.random(n_options) < stale_fraction
+    S[stale] *= 1.0 + stale_move * rng.choice([-1.0, 1.0], size=stale.sum())
+    k = np.log(K / (S * np.exp((rate - dividend_yield) * T)))
+    vol = np.sqrt(total_variance(k, T, model) / T)
+    price = black_scholes_call(S, K, T, rate, dividend_yield, vol)["price"]
+
+    half = 0.5 * np.maximum(spread_pct * price, 0.02) * (1.0 + wing_spread * np.abs(k) / np.sqrt(T))
+    half *= rng.lognormal(0.0, 0.25, n_options)
+    tick = _tick(price)
+    bid = np.maximum(np.floor((price - half) / tick) * tick, 0.0)
+    ask = np.maximum(np.ceil((price + half) / tick) * tick, bid + tick)
+
+    volume = np.floor(rng.lognormal(4.0, 1.5, n_options) * np.exp(-4.0 * np.abs(k)))
+    volume[stale] = 0.0
+
+    injected = _inject(inject_arbitrage, exp_idx, K, bid, ask, arbitrage_edge, rng)
+
+    exp_dates = np.array([as_of + timedelta(days=int(d)) for d in days], dtype=object)
+    chain = pd.DataFrame({
+        "strike": np.round(K, 4),
+        "bid": np.round(bid, 2),
+        "ask": np.round(ask, 2),
+        "volume": volume.astype(np.int64),
+        "expiration": exp_dates[exp_idx],
+        "days_to_expiry": days[exp_idx].astype(int),
+    })
+    # Plain tuples, not a DataFrame: pandas compares attrs when concatenating.
+    chain.attrs["injected_arbitrage"] = list(zip(
+        injected[0].tolist(), days[exp_idx[injected[1]]].astype(int).tolist(), K[injected[1]].tolist()
+    ))
+    return chain
+
+
+def put_chain(calls: pd.DataFrame, spot: float = 100.0, rate: float = 0.045, dividend_yield: float = 0.0,
+              seed: int = 0) -> pd.DataFrame:
+    """Puts on the strikes of a `generate_chain` call chain, priced from the call mids by put-call parity.
+
+    Half-spreads are the calls' with lognormal noise, snapped to the same
+    ticks, so implied_forwards on the pair recovers `rate` and `dividend_yield`.
+    """
+    rng = np.random.default_rng(seed)
+    K = calls["strike"].to_numpy(dtype=float)
+    T = calls["days_to_expiry"].to_numpy() / TRADING_DAYS
+    call_mid = 0.5 * (calls["bid"] + calls["ask"]).to_numpy(dtype=float)
+    price = np.maximum(call_mid - spot * np.exp(-dividend_yield * T) + K * np.exp(-rate * T), 0.0)
+
+    half = 0.5 * (calls["ask"] - calls["bid"]).to_numpy(dtype=float) * rng.lognormal(0.0, 0.25, len(calls))
+    tick = _tick(price)
+    bid = np.maximum(np.floor((price - half) / tick) * tick, 0.0)
+    ask = np.maximum(np.ceil((price + half) / tick) * tick, bid + tick)
+    return calls[CHAIN_COLUMNS].assign(bid=np.round(bid, 2), ask=np.round(ask, 2))
+
+
+def _inject(counts, exp_idx, K, bid, ask, edge, rng):
+    """Overwrite quotes in place to plant violations; returns (kinds, middle-or-upper leg rows)."""
+    if isinstance(counts, int):
+        counts = {kind: counts // len(ARBITRAGE_KINDS) + (i < counts % len(ARBITRAGE_KINDS))
+                  for i, kind in enumerate(ARBITRAGE_KINDS)}
+    unknown = set(counts) - set(ARBITRAGE_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown arbitrage kinds: {sorted(unknown)}")
+
+    # Rows with a same-expiry neighbour on both sides, spaced so plants do not overlap.
+    interior = np.flatnonzero((exp_idx[1:-1] == exp_idx[:-2]) & (exp_idx[1:-1] == exp_idx[2:])) + 1
+    interior = interior[(ask[interior - 1] > 0.5) & (ask[interior + 1] > 0.5)]
+    total = sum(counts.values())
+    chosen = rng.choice(interior[::3], size=min(total, len(interior[::3])), replace=False) if total else np.array([], int)
+
+    kinds = np.repeat(list(counts), list(counts.values()))[:len(chosen)]
+    lo, mid, hi = chosen - 1, chosen, chosen + 1
+
+    vert = kinds == "vertical"
+    # Upper strike bids above the lower strike's ask: sell K_hi, buy K_lo for a credit.
+    bid[hi[vert]] = np.round(ask[lo[vert]] * (1.0 + edge), 2)
+    ask[hi[vert]] = bid[hi[vert]] + _tick(bid[hi[vert]])
+
+    fly = kinds == "butterfly"
+    l, m, h = lo[fly], mid[fly], hi[fly]
+    w1 = (K[h] - K[m]) / (K[h] - K[l])
+    w3 = (K[m] - K[l]) / (K[h] - K[l])
+    bid[m] = np.round((w1 * ask[l] + w3 * ask[h]) * (1.0 + edge), 2)
+    ask[m] = bid[m] + _tick(bid[m])
+
+    rows = np.where(vert, hi, mid)
+    return kinds, rows
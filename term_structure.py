@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from black_scholes import TRADING_DAYS
+
+# Call forward-deltas of the quoted wings; a 25-delta put has call delta 0.75.
+DELTAS = (0.25, 0.10)
+TERM_STRUCTURE_COLUMNS = [
+    "days_to_expiry", "forward", "atm_iv", "rr25", "bf25", "rr10", "bf10",
+    "skew_slope", "skew_curvature", "options",
+]
+# Skew slope/curvature are fitted within this many ATM standard deviations of the forward.
+SKEW_BAND = 1.0
+
+
+def _segment_interp(x: np.ndarray, y: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                    group: np.ndarray, target: np.ndarray, extrapolate: bool = False) -> np.ndarray:
+    """Per-segment linear interpolation of y at x = target[segment].
+
+    x must be increasing within each segment. Targets outside a segment's
+    range give NaN, or the end value when `extrapolate`.
+    """
+    below = np.bincount(group, weights=x < target[group], minlength=len(counts)).astype(int)
+    hi = starts + np.clip(below, 1, np.maximum(counts - 1, 1))
+    lo = hi - 1
+    hi = np.minimum(hi, starts + counts - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(x[hi] > x[lo], (target - x[lo]) / (x[hi] - x[lo]), 0.0)
+    if extrapolate:
+        t = np.clip(t, 0.0, 1.0)
+    value = y[lo] + t * (y[hi] - y[lo])
+    inside = (below > 0) & (below < counts)
+    return value if extrapolate else np.where(inside, value, np.nan)
+
+
+def _quadratic_fits(group: np.ndarray, n: int, x: np.ndarray, y: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """(n, 3) weighted least-squares coefficients of y = c0 + c1 x + c2 x^2 per group."""
+    powers = [np.bincount(group, weights=w * x ** p, minlength=n) for p in range(5)]
+    rhs = np.stack([np.bincount(group, weights=w * y * x ** p, minlength=n) for p in range(3)], axis=1)
+    A = np.stack([np.stack(powers[i:i + 3], axis=1) for i in range(3)], axis=1)
+    det = np.linalg.det(A)
+    ok = np.abs(det) > 1e-12 * np.maximum(powers[0], 1.0) ** 3
+    A[~ok] = np.eye(3)
+    coef = np.linalg.solve(A, rhs[..., None])[..., 0]
+    coef[~ok] = np.nan
+    return coef
+
+
+def term_structure(df: pd.DataFrame, spot_price: float | None = None) -> pd.DataFrame:
+    """Per-expiry ATM-forward IV, 25/10-delta risk reversals and butterflies, and skew shape.
+
+    One sort plus grouped reductions over the whole chain; no per-expiry
+    loop. Forwards come from each row's spot_price/risk_free_rate/
+    dividend_yield columns when present (else `spot_price` with zero carry).
+    ATM IV is interpolated in log-moneyness at the forward; wing vols are
+    interpolated in forward call delta and are NaN when the chain does not
+    reach that delta. rr = vol(call) - vol(put), bf = mean(call, put) - ATM,
+    and skew_slope / skew_curvature are the first and second derivatives of
+    IV in log-moneyness at the forward from a quadratic fit near the money.
+    """
+    frame = df[np.isfinite(df["imp_vol"].to_numpy(dtype=float)) & (df["imp_vol"].to_numpy(dtype=float) > 0)]
+    if frame.empty:
+        return pd.DataFrame(columns=TERM_STRUCTURE_COLUMNS)
+
+    days = frame["days_to_expiry"].to_numpy()
+    T = days / TRADING_DAYS
+    S = frame["spot_price"].to_numpy(dtype=float) if "spot_price" in frame else np.full(len(frame), float(spot_price))
+    carry = np.zeros(len(frame))
+    if "risk_free_rate" in frame and "dividend_yield" in frame:
+        carry = frame["risk_free_rate"].to_numpy(dtype=float) - frame["dividend_yield"].to_numpy(dtype=float)
+    forward = S * np.exp(carry * T)
+    k = np.log(frame["strike"].to_numpy(dtype=float) / forward)
+    vol = frame["imp_vol"].to_numpy(dtype=float)
+
+    order = np.lexsort((k, days))
+    days, T, forward, k, vol = days[order], T[order], forward[order], k[order], vol[order]
+    expiries, starts, counts = np.unique(days, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(expiries)), counts)
+    T_exp, forward_exp = T[starts], forward[starts]
+
+    atm = _segment_interp(k, vol, starts, counts, group, np.zeros(len(expiries)), extrapolate=True)
+
+    # Forward call delta decreases in strike; interpolate on its negative so x increases.
+    sqrt_T = np.sqrt(T)
+    call_delta = ndtr((-k + 0.5 * vol ** 2 * T) / (vol * sqrt_T))
+    wings = {}
+    for delta in DELTAS:
+        call_vol = _segment_interp(-call_delta, vol, starts, counts, group, np.full(len(expiries), -delta))
+        put_vol = _segment_interp(-call_delta, vol, starts, counts, group, np.full(len(expiries), delta - 1.0))
+        label = f"{round(delta * 100):d}"
+        wings[f"rr{label}"] = call_vol - put_vol
+        wings[f"bf{label}"] = 0.5 * (call_vol + put_vol) - atm
+
+    band = SKEW_BAND * np.maximum(atm * np.sqrt(T_exp), 0.02)
+    near = np.abs(k) <= band[group]
+    coef = _quadratic_fits(group[near], len(expiries), k[near], vol[near], np.ones(near.sum()))
+    enough = np.bincount(group[near], minlength=len(expiries)) >= 3
+
+    return pd.DataFrame({
+        "days_to_expiry": expiries,
+        "forward": forward_exp,
+        "atm_iv": atm,
+        **wings,
+        "skew_slope": np.where(enough, coef[:, 1], np.nan),
+        "skew_curvature": np.where(enough, 2.0 * coef[:, 2], np.nan),
+        "options": counts,
+    }, columns=TERM_STRUCTURE_COLUMNS)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from arbitrage import IncrementalArbitrageDetector, detect_arbitrage, format_arbitrage
+from synthetic import STRIKE_REGIMES, generate_chain
+
+CHAINS = 60
+ROUNDS = 15
+PARITY_CHAINS = 100
+
+
+def _key(opp):
+    return (opp.kind, opp.expiry, tuple(leg.strike for leg in opp.legs))
+
+
+def _random_updates(frame: pd.DataFrame, rng: np.random.Generator) -> list[tuple]:
+    """Reprices, removes and inserts a handful of quotes, some of them into violations."""
+    updates = []
+    rows = frame.iloc[rng.choice(len(frame), size=min(len(frame), rng.integers(1, 8)), replace=False)]
+    for row in rows.itertuples(index=False):
+        action = rng.random()
+        if action < 0.15:
+            updates.append((row.days_to_expiry, row.strike, 0.0, 0.0))
+        else:
+            # Large moves regularly cross a neighbour and open verticals and butterflies.
+            mid = max(0.5 * (row.bid + row.ask) * rng.lognormal(0.0, 0.3 if action < 0.6 else 0.05), 0.02)
+            half = max(0.01, mid * rng.uniform(0.005, 0.05))
+            updates.append((row.days_to_expiry, row.strike, round(max(mid - half, 0.01), 2), round(mid + half, 2)))
+    for _ in range(rng.integers(0, 3)):
+        expiry = rng.choice(frame["days_to_expiry"].unique())
+        strike = round(float(rng.uniform(frame["strike"].min(), frame["strike"].max())), 1)
+        mid = float(rng.uniform(0.05, 30.0))
+        updates.append((expiry, strike, round(mid * 0.98, 2), round(mid * 1.02, 2)))
+    return updates
+
+
+@pytest.mark.parametrize("seed", range(CHAINS))
+def test_incremental_matches_full_rescan(seed):
+    rng = np.random.default_rng(seed)
+    chain = generate_chain(int(rng.integers(30, 200)), n_expiries=int(rng.integers(1, 5)), spot=100.0,
+                           inject_arbitrage=int(rng.integers(0, 6)), seed=seed)
+    detector = IncrementalArbitrageDetector(chain, butterfly_span=int(rng.integers(2, 5)))
+    span = detector.butterfly_span
+    assert detector.opportunities == detect_arbitrage(chain, cross_expiry=False, butterfly_span=span)
+
+    for _ in range(ROUNDS):
+        if detector.to_frame().empty:
+            break
+        before = {_key(opp) for opp in detector.opportunities}
+        opened, closed = detector.update(_random_updates(detector.to_frame(), rng))
+        after = {_key(opp) for opp in detector.opportunities}
+
+        assert detector.opportunities == detect_arbitrage(detector.to_frame(), cross_expiry=False,
+                                                          butterfly_span=span)
+        assert {_key(opp) for opp in opened} == after - before
+        assert {_key(opp) for opp in closed} == before - after
+
+
+def _pct_edge(numerator: float, denominator: float) -> float:
+    return abs(numerator) / max(denominator, 1e-9)
+
+
+def _reference_messages(calls: pd.DataFrame, butterfly_span: int, min_edge: float = 0.02,
+                        min_abs_profit: float = 0.01) -> list[str]:
+    """The per-expiry loop detect_arbitrage replaced, with butterflies on every triple within the span."""
+    messages = []
+    calls = calls[(calls["bid"] > 0) & (calls["ask"] > 0)]
+    for expiry, grp in calls.groupby("days_to_expiry"):
+        grp = grp.sort_values("strike", kind="mergesort")
+        k, bid, ask = (grp[c].to_numpy(dtype=float) for c in ("strike", "bid", "ask"))
+        head = f"Significant {{}} at expiry {int(expiry)} days: "
+        n = len(k)
+
+        for i in range(n - 1):
+            credit = bid[i + 1] - ask[i]
+            if credit > min_abs_profit and _pct_edge(credit, ask[i]) >= min_edge:
+                messages.append(head.format("Vertical Dominance Arbitrage") + (
+                    f"Buy at ask {k[i]:.2f} (${ask[i]:.2f}), sell at bid {k[i+1]:.2f} (${bid[i+1]:.2f}), "
+                    f"credit: ${credit:.2f}, edge: {_pct_edge(credit, ask[i])*100:.1f}%."
+                ))
+
+        for i in range(n - 1):
+            cost_to_buy = ask[i] - bid[i + 1]
+            if cost_to_buy < -min_abs_profit and _pct_edge(cost_to_buy, ask[i]) >= min_edge:
+                messages.append(head.format("Call Spread Arbitrage") + (
+                    f"Buy at ask {k[i]:.2f} (${ask[i]:.2f}), sell at bid {k[i+1]:.2f} (${bid[i+1]:.2f}), "
+                    f"credit: ${-cost_to_buy:.2f} exceeds zero lower bound, "
+                    f"edge: {_pct_edge(cost_to_buy, ask[i])*100:.1f}%."
+                ))
+            credit_to_sell = bid[i] - ask[i + 1]
+            excess = credit_to_sell - (k[i + 1] - k[i])
+            if excess > min_abs_profit and _pct_edge(excess, ask[i + 1]) >= min_edge:
+                messages.append(head.format("Reverse Call Spread Arbitrage") + (
+                    f"Sell at bid {k[i]:.2f} (${bid[i]:.2f}), buy at ask {k[i+1]:.2f} (${ask[i+1]:.2f}), "
+                    f"net credit: ${credit_to_sell:.2f} exceeds strike diff ${k[i+1] - k[i]:.2f}, "
+                    f"edge: {_pct_edge(excess, ask[i+1])*100:.1f}%."
+                ))
+
+        for i in range(n - 2):
+            for j in range(i + 1, min(i + butterfly_span, n - 1)):
+                for l in range(j + 1, min(i + butterfly_span, n - 1) + 1):
+                    w1 = (k[l] - k[j]) / (k[l] - k[i])
+                    w3 = (k[j] - k[i]) / (k[l] - k[i])
+                    rhs = w1 * ask[i] + w3 * ask[l]
+                    excess = bid[j] - rhs
+                    if excess > min_abs_profit and _pct_edge(excess, rhs) >= min_edge:
+                        messages.append(head.format("Butterfly Arbitrage") + (
+                            f"Buy at ask {k[i]:.2f} (${ask[i]:.2f}) and {k[l]:.2f} (${ask[l]:.2f}), "
+                            f"sell at bid {k[j]:.2f} (${bid[j]:.2f}), net credit: ${excess:.2f}, "
+                            f"edge: {_pct_edge(excess, rhs)*100:.1f}%."
+                        ))
+    return messages or ["✅ No significant arbitrage opportunities detected."]
+
+
+@pytest.mark.parametrize("seed", range(PARITY_CHAINS))
+def test_vectorized_scan_matches_reference_loop(seed):
+    rng = np.random.default_rng(seed)
+    chain = generate_chain(int(rng.integers(20, 300)), n_expiries=int(rng.integers(1, 6)), spot=100.0,
+                           strike_regime=STRIKE_REGIMES[seed % len(STRIKE_REGIMES)],
+                           inject_arbitrage=int(rng.integers(0, 8)), seed=seed)
+    # Jitter quotes so violations of every kind, at every distance, show up.
+    noise = rng.lognormal(0.0, 0.3, len(chain)) * (rng.random(len(chain)) < 0.3)
+    chain["bid"] = np.round(chain["bid"] * np.where(noise > 0, noise, 1.0), 2)
+    chain["ask"] = np.round(np.maximum(chain["ask"] * np.where(noise > 0, noise, 1.0), chain["bid"] + 0.01), 2)
+    span = int(rng.integers(2, 6))
+
+    assert format_arbitrage(detect_arbitrage(chain, cross_expiry=False, butterfly_span=span)) == \
+        _reference_messages(chain, span)
@@ -0,0 +1,94 @@
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import providers
+from data_fetch import get_option_chains
+from providers import MarketDataProvider, set_provider
+
+# Wall-clock slack for thread start-up and scheduling on a loaded machine.
+SLACK = 0.15
+
+
+class StubTicker:
+    """yfinance-shaped ticker whose option_chain sleeps and fails on demand, per expiration."""
+
+    def __init__(self, delays, failures=None):
+        today = date.today()
+        self.options = [(today + timedelta(days=30 * (i + 1))).isoformat() for i in range(len(delays))]
+        self.delays = dict(zip(self.options, delays))
+        self.failures = dict(zip(self.options, failures or [0] * len(delays)))
+        self.attempts = {exp: 0 for exp in self.options}
+        self.fast_info = {"last_price": 100.0}
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def option_chain(self, exp):
+        with self._lock:
+            self.attempts[exp] += 1
+            attempt = self.attempts[exp]
+        self.release.wait(self.delays[exp])
+        if attempt <= self.failures[exp]:
+            raise ConnectionError(f"attempt {attempt} failed")
+        frame = pd.DataFrame({"strike": [95.0, 100.0, 105.0], "bid": [6.0, 3.0, 1.0], "ask": [6.2, 3.2, 1.2]})
+        return SimpleNamespace(calls=frame, puts=frame.copy())
+
+    def history(self, period="1d"):
+        return pd.DataFrame({"Close": [100.0]})
+
+
+@pytest.fixture(autouse=True)
+def offline_provider():
+    previous = providers._provider
+    set_provider(MarketDataProvider())
+    yield
+    set_provider(previous)
+
+
+def _fetch(stub, **kwargs):
+    start = time.perf_counter()
+    try:
+        calls, puts, spot = get_option_chains("STUB", ticker=stub, **kwargs)
+    finally:
+        stub.release.set()
+    return calls, puts, time.perf_counter() - start
+
+
+def test_latency_tracks_slowest_expiration():
+    delays = [0.05, 0.1, 0.15, 0.2, 0.25, 0.3]
+    stub = StubTicker(delays)
+    calls, puts, elapsed = _fetch(stub, max_workers=8)
+
+    assert max(delays) <= elapsed < max(delays) + SLACK
+    assert calls["expiration"].nunique() == puts["expiration"].nunique() == len(delays)
+
+
+def test_failed_attempts_are_retried_with_backoff():
+    stub = StubTicker([0.0, 0.0, 0.0], failures=[0, 2, 3])
+    calls, _, elapsed = _fetch(stub, retries=2, backoff=0.05)
+
+    assert stub.attempts == dict(zip(stub.options, [1, 3, 3]))
+    assert sorted(calls["expiration"].astype(str).unique()) == stub.options[:2]
+    # Two backoffs (0.05 + 0.1) before the final attempt.
+    assert 0.15 <= elapsed < 0.15 + SLACK
+
+
+def test_deadline_abandons_stuck_expirations():
+    stub = StubTicker([0.05, 0.1, 30.0])
+    calls, _, elapsed = _fetch(stub, timeout=0.3)
+
+    assert 0.3 <= elapsed < 0.3 + SLACK
+    assert sorted(calls["expiration"].astype(str).unique()) == stub.options[:2]
+
+
+def test_deadline_covers_retries():
+    stub = StubTicker([0.1, 0.1], failures=[0, 5])
+    calls, _, elapsed = _fetch(stub, timeout=0.4, retries=5, backoff=0.1)
+
+    assert 0.4 <= elapsed < 0.4 + SLACK
+    assert 1 < stub.attempts[stub.options[1]] < 6
+    assert calls["expiration"].astype(str).unique().tolist() == stub.options[:1]
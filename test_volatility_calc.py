@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from black_scholes import TRADING_DAYS
+from volatility_calc import (call_price_black_scholes, implied_volatility, implied_volatility_batch,
+                             put_implied_volatility_batch)
+
+SEEDS = 10
+N = 300
+TOL = 1e-6
+
+
+def _scalar(price, S, K, T, r, q):
+    out = [implied_volatility(*args) for args in zip(price, S, K, T, r, q)]
+    return np.array([np.nan if iv is None else iv for iv in out])
+
+
+def _random_inputs(rng, n):
+    S = rng.uniform(20.0, 500.0, n)
+    K = S * np.exp(rng.normal(0.0, 0.3, n))
+    T = rng.integers(1, 3 * int(TRADING_DAYS), n) / TRADING_DAYS
+    r = rng.uniform(0.0, 0.08, n)
+    q = rng.uniform(0.0, 0.05, n)
+    vol = rng.uniform(0.05, 2.0, n)
+    price = np.array([call_price_black_scholes(*args) for args in zip(S, K, T, r, q, vol)])
+    # Quote noise pushes some prices below intrinsic or past the solvable range.
+    price *= np.where(rng.random(n) < 0.2, rng.uniform(0.5, 1.5, n), 1.0)
+    return price, S, K, T, r, q
+
+
+def _assert_same(batch, scalar):
+    assert np.array_equal(np.isnan(batch), np.isnan(scalar))
+    both = ~np.isnan(batch)
+    assert np.max(np.abs(batch[both] - scalar[both]), initial=0.0) < TOL
+
+
+@pytest.mark.parametrize("seed", range(SEEDS))
+def test_batch_matches_scalar_on_random_chains(seed):
+    args = _random_inputs(np.random.default_rng(seed), N)
+    _assert_same(implied_volatility_batch(*args), _scalar(*args))
+
+
+@pytest.mark.parametrize("seed", range(SEEDS))
+def test_put_batch_matches_scalar_through_parity(seed):
+    price, S, K, T, r, q = _random_inputs(np.random.default_rng(seed), N)
+    put = price - S * np.exp(-q * T) + K * np.exp(-r * T)
+    scalar = _scalar(put + S * np.exp(-q * T) - K * np.exp(-r * T), S, K, T, r, q)
+    scalar[put <= 0] = np.nan
+    _assert_same(put_implied_volatility_batch(put, S, K, T, r, q), scalar)
+
+
+@pytest.mark.parametrize("price, S, K, T", [
+    (5.0, 100.0, 100.0, 0.0),       # expired
+    (5.0, 100.0, 100.0, -0.1),      # negative maturity
+    (0.0, 100.0, 100.0, 0.5),       # no price
+    (5.0, 100.0, 0.0, 0.5),         # no strike
+    (5.0, 0.0, 100.0, 0.5),         # no spot
+    (10.0, 120.0, 100.0, 0.5),      # below intrinsic
+    (150.0, 100.0, 100.0, 0.5),     # above the spot: no volatility reaches it
+    (60.0, 100.0, 100.0, 0.01),     # past the price at the 10.0 volatility ceiling
+])
+def test_batch_matches_scalar_failures(price, S, K, T):
+    assert implied_volatility(price, S, K, T, 0.03) is None
+    assert np.isnan(implied_volatility_batch(price, S, K, T, 0.03))
+
+
+def test_batch_matches_scalar_at_intrinsic():
+    S, K, T, r = 120.0, 100.0, 0.5, 0.03
+    intrinsic = S - K * np.exp(-r * T)
+    assert implied_volatility(intrinsic, S, K, T, r) == implied_volatility_batch(intrinsic, S, K, T, r) == 1e-6
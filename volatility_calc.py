@@ -2,25 +2,32 @@ import math
 from scipy.stats import norm
 from scipy.optimize import brentq
 import numpy as np
-import yfinance as yf
 from datetime import datetime
 import pandas as pd
 
-def get_risk_free_rate():
+from black_scholes import TRADING_DAYS, call_price_vega_volga
+from cache import DIVIDEND_TTL, RATE_TTL, SPOT_TTL, market_cache
+from forwards import carry_for
+from metrics import record_dropped, record_iv_failures, span, timed
+from providers import get_provider
+from quality import quality_report
+from term_structure import term_structure
+
+def _fetch_risk_free_rate():
     try:
-        treasury_10y = yf.Ticker("^TNX")
+        treasury_10y = get_provider().ticker("^TNX")
         hist = treasury_10y.history(period="1d")
         if not hist.empty:
             rate = hist['Close'].iloc[-1] / 100.0
             return rate
         
-        treasury_3m = yf.Ticker("^IRX")
+        treasury_3m = get_provider().ticker("^IRX")
         hist = treasury_3m.history(period="1d")
         if not hist.empty:
             rate = hist['Close'].iloc[-1] / 100.0
             return rate
         
-        treasury_1m = yf.Ticker("^BIL")
+        treasury_1m = get_provider().ticker("^BIL")
         hist = treasury_1m.history(period="1d")
         if not hist.empty:
             price = hist['Close'].iloc[-1]
@@ -31,28 +38,50 @@ def get_risk_free_rate():
         
     except Exception as e:
         print(f"Warning: Could not fetch risk-free rate: {e}")
-        return 0.05
+        return None
 
-def get_market_data(ticker_symbol):
+def get_risk_free_rate():
+    rate = market_cache.get(('risk_free_rate',))
+    if rate is None:
+        rate = _fetch_risk_free_rate()
+        if rate is None:
+            return 0.05
+        market_cache.set(('risk_free_rate',), rate, ttl=RATE_TTL)
+    return rate
+
+@timed("market_data", ticker_arg=0)
+def get_market_data(ticker_symbol, include_carry=True):
+    """Spot, dividend yield and risk-free rate; with include_carry=False only the spot is looked up."""
     try:
-        ticker = yf.Ticker(ticker_symbol)
+        spot_price = market_cache.get(('spot_price', ticker_symbol))
+        dividend_yield = market_cache.get(('dividend_yield', ticker_symbol))
+        if not include_carry:
+            dividend_yield = dividend_yield if dividend_yield is not None else 0.0
+        
+        if spot_price is None or dividend_yield is None:
+            ticker = get_provider().ticker(ticker_symbol)
+            info = ticker.fast_info
         
-        info = ticker.fast_info
-        spot_price = info.get('last_price') or info.get('lastPrice')
         if spot_price is None:
-            hist = ticker.history(period="1d")
-            if not hist.empty:
-                spot_price = hist['Close'].iloc[-1]
+            spot_price = info.get('last_price') or info.get('lastPrice')
+            if spot_price is None:
+                hist = ticker.history(period="1d")
+                if not hist.empty:
+                    spot_price = hist['Close'].iloc[-1]
+            if spot_price is not None:
+                market_cache.set(('spot_price', ticker_symbol), spot_price, ttl=SPOT_TTL)
         
-        dividend_yield = 0.0
-        try:
-            dividend_yield = info.get('dividend_yield', 0.0)
-            if dividend_yield is None:
-                dividend_yield = 0.0
-        except:
-            pass
+        if dividend_yield is None:
+            dividend_yield = 0.0
+            try:
+                dividend_yield = info.get('dividend_yield', 0.0)
+                if dividend_yield is None:
+                    dividend_yield = 0.0
+            except:
+                pass
+            market_cache.set(('dividend_yield', ticker_symbol), dividend_yield, ttl=DIVIDEND_TTL)
         
-        risk_free_rate = get_risk_free_rate()
+        risk_free_rate = get_risk_free_rate() if include_carry else None
         
         return {
             'spot_price': spot_price,
@@ -67,6 +96,9 @@ def get_market_data(ticker_symbol):
             'risk_free_rate': 0.05
         }
 
+def market_cache_stats():
+    return market_cache.stats()
+
 def call_price_black_scholes(S, K, T, r, q, vol):
     if T <= 0:
         return max(S - K, 0.0)
@@ -117,45 +149,152 @@ def implied_volatility(price, S, K, T, r, q=0.0, method='brentq'):
     except Exception as e:
         return None
 
-def calculate_implied_volatility_with_market_data(options_df, ticker_symbol, use_american_adjustment=True):
-    market_data = get_market_data(ticker_symbol)
-    spot_price = market_data['spot_price']
-    dividend_yield = market_data['dividend_yield']
-    risk_free_rate = market_data['risk_free_rate']
+def implied_volatility_batch(price, S, K, T, r, q=0.0, max_iter=100, xtol=1e-8):
+    """Array-in/array-out version of implied_volatility; failures are NaN."""
+    price, S, K, T, r, q = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (price, S, K, T, r, q))
+    )
+    iv = np.full(price.shape, np.nan)
+
+    with np.errstate(all='ignore'):
+        valid = (price > 0) & (S > 0) & (K > 0) & (T > 0)
+        disc_S = S * np.exp(-q * T)
+        disc_K = K * np.exp(-r * T)
+        intrinsic = np.maximum(disc_S - disc_K, 0.0)
+        valid &= price >= intrinsic - 1e-6
+
+        at_intrinsic = valid & (np.abs(price - intrinsic) < 1e-6)
+        iv[at_intrinsic] = 1e-6
+
+        idx = np.flatnonzero(valid & ~at_intrinsic)
+        if idx.size == 0:
+            return iv
+        target = price.ravel()[idx]
+        dS = disc_S.ravel()[idx]
+        dK = disc_K.ravel()[idx]
+        sqrtT = np.sqrt(T.ravel()[idx])
+
+        lo = np.full(idx.size, 1e-8)
+        hi = np.full(idx.size, 10.0)
+        upper_price, _, _ = call_price_vega_volga(dS, dK, sqrtT, hi)
+        solvable = target <= upper_price
+        idx, target, dS, dK, sqrtT, lo, hi = (
+            a[solvable] for a in (idx, target, dS, dK, sqrtT, lo, hi)
+        )
+
+        # Corrado-Miller rational approximation as the starting point.
+        half_diff = 0.5 * (dS - dK)
+        excess = target - half_diff
+        disc = np.maximum(excess**2 - (dS - dK) ** 2 / np.pi, 0.0)
+        vol = np.sqrt(2 * np.pi) / (sqrtT * (dS + dK)) * (excess + np.sqrt(disc))
+        vol = np.where(np.isfinite(vol) & (vol > lo) & (vol < hi), vol, 0.3)
+
+        result = np.full(idx.size, np.nan)
+        active = np.arange(idx.size)
+        for _ in range(max_iter):
+            p, vega, volga = call_price_vega_volga(dS[active], dK[active], sqrtT[active], vol)
+            diff = p - target[active]
+            below = diff < 0
+            lo[active] = np.where(below, vol, lo[active])
+            hi[active] = np.where(below, hi[active], vol)
+
+            # Halley step, falling back to bisection when it leaves the bracket.
+            newton = diff / vega
+            step = newton / (1.0 - 0.5 * newton * volga / vega)
+            new_vol = vol - step
+            outside = ~np.isfinite(new_vol) | (new_vol <= lo[active]) | (new_vol >= hi[active])
+            new_vol = np.where(outside, 0.5 * (lo[active] + hi[active]), new_vol)
+
+            new_vol = np.where(diff == 0, vol, new_vol)
+
+            done = (np.abs(new_vol - vol) < xtol) | (hi[active] - lo[active] < xtol)
+            result[active[done]] = new_vol[done]
+            active = active[~done]
+            vol = new_vol[~done]
+            if active.size == 0:
+                break
+
+        ok = (result >= 0) & (result <= 10.0)
+        iv.ravel()[idx[ok]] = result[ok]
+    return iv
+
+def put_implied_volatility_batch(price, S, K, T, r, q=0.0, max_iter=100, xtol=1e-8):
+    """Put implied vols, solved as the parity-equivalent call prices; failures are NaN."""
+    price, S, K, T, r, q = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (price, S, K, T, r, q))
+    )
+    with np.errstate(all='ignore'):
+        call_price = np.where(price > 0, price + S * np.exp(-q * T) - K * np.exp(-r * T), np.nan)
+    return implied_volatility_batch(call_price, S, K, T, r, q, max_iter=max_iter, xtol=xtol)
+
+def calculate_implied_volatility_with_market_data(options_df, ticker_symbol, use_american_adjustment=True,
+                                                  option_type='call', forwards=None, spot_price=None):
+    """Implied vols for one side of the chain.
+
+    `forwards` (from forwards.implied_forwards) supplies a per-expiry rate and
+    dividend yield implied by put-call parity; expiries it does not cover
+    fall back to the quoted dividend yield and Treasury rate, which are only
+    fetched when some expiry needs them. `spot_price`, when given, is used
+    instead of the cached spot.
+    """
+    implied_r, implied_q = carry_for(options_df['days_to_expiry'].to_numpy(), forwards)
+    fitted = ~np.isnan(implied_r)
+    market_data = get_market_data(ticker_symbol, include_carry=not (fitted.size and fitted.all()))
+    if spot_price is None:
+        spot_price = market_data['spot_price']
+    if fitted.any():
+        options_df = options_df.assign(_r=implied_r, _q=implied_q)
     
     if spot_price is None:
         print("Warning: Could not determine spot price, using fallback")
         spot_price = options_df['strike'].median()
     
     df = options_df.copy()
+    price_col = f'{option_type}_price'
     
     if 'bid' in df.columns and 'ask' in df.columns:
         df['mid_price'] = (df['bid'] + df['ask']) / 2
-        df['call_price'] = df['ask']
+        df[price_col] = df['ask']
         
         df['spread_pct'] = (df['ask'] - df['bid']) / df['mid_price']
+        before = len(df)
         df = df[df['spread_pct'] < 0.5]
+        record_dropped('wide_spread', before - len(df), ticker_symbol)
     elif 'lastPrice' in df.columns:
-        df['call_price'] = df['lastPrice']
+        df[price_col] = df['lastPrice']
     else:
         print("Warning: No pricing data available")
         return df
     
     if use_american_adjustment:
         df['moneyness'] = (spot_price - df['strike']) / spot_price
+        if option_type == 'put':
+            df['moneyness'] = -df['moneyness']
+        before = len(df)
         df = df[df['moneyness'] < 0.2]
+        record_dropped('deep_itm', before - len(df), ticker_symbol)
     
-    def calc_iv(row):
-        return implied_volatility(
-            price=row['call_price'],
+    risk_free_rate = market_data['risk_free_rate']
+    dividend_yield = market_data['dividend_yield']
+    if '_r' in df.columns:
+        implied_r = df.pop('_r').to_numpy(dtype=float)
+        implied_q = df.pop('_q').to_numpy(dtype=float)
+        if risk_free_rate is not None:
+            implied_r = np.where(np.isnan(implied_r), risk_free_rate, implied_r)
+            implied_q = np.where(np.isnan(implied_q), dividend_yield, implied_q)
+        risk_free_rate, dividend_yield = implied_r, implied_q
+    
+    solver = put_implied_volatility_batch if option_type == 'put' else implied_volatility_batch
+    with span('iv_solve', ticker_symbol):
+        df['imp_vol'] = solver(
+            price=df[price_col].to_numpy(dtype=float),
             S=spot_price,
-            K=row['strike'],
-            T=row['days_to_expiry'] / 252.0,
+            K=df['strike'].to_numpy(dtype=float),
+            T=df['days_to_expiry'].to_numpy(dtype=float) / TRADING_DAYS,
             r=risk_free_rate,
             q=dividend_yield
         )
-    
-    df['imp_vol'] = df.apply(calc_iv, axis=1)
+    record_iv_failures(int(df['imp_vol'].isna().sum()), ticker_symbol)
     
     df['spot_price'] = spot_price
     df['dividend_yield'] = dividend_yield
@@ -163,6 +302,27 @@ def calculate_implied_volatility_with_market_data(options_df, ticker_symbol, use
     
     return df
 
+def merge_otm_options(calls, puts):
+    """OTM puts below the forward and OTM calls at or above it, tagged with `option_type`.
+
+    Both frames come from calculate_implied_volatility_with_market_data. The
+    forward is taken per row from its spot, rate and dividend columns.
+    Expiries with no puts keep all of their calls.
+    """
+    calls = calls.assign(option_type='call')
+    if puts is None or puts.empty:
+        return calls
+    frame = pd.concat([calls, puts.assign(option_type='put')], ignore_index=True)
+    T = frame['days_to_expiry'].to_numpy(dtype=float) / TRADING_DAYS
+    carry = frame['risk_free_rate'].to_numpy(dtype=float) - frame['dividend_yield'].to_numpy(dtype=float)
+    forward = frame['spot_price'].to_numpy(dtype=float) * np.exp(carry * T)
+    strike = frame['strike'].to_numpy(dtype=float)
+    is_put = frame['option_type'].to_numpy() == 'put'
+    no_puts = ~np.isin(frame['days_to_expiry'].to_numpy(), puts['days_to_expiry'].unique())
+    keep = np.where(is_put, strike < forward, (strike >= forward) | no_puts)
+    merged = frame[keep].sort_values(['days_to_expiry', 'strike'], kind='mergesort')
+    return merged.reset_index(drop=True)
+
 def filter_quality_options(df, min_volume=0, max_spread_pct=0.3):
     filtered_df = df.copy()
     
@@ -182,37 +342,29 @@ def filter_quality_options(df, min_volume=0, max_spread_pct=0.3):
     return filtered_df
 
 def calculate_term_structure_iv(df, spot_price):
-    atm_options = []
-    
-    for expiry in df['days_to_expiry'].unique():
-        exp_data = df[df['days_to_expiry'] == expiry]
-        if len(exp_data) == 0:
-            continue
-            
-        atm_idx = (exp_data['strike'] - spot_price).abs().idxmin()
-        atm_option = exp_data.loc[atm_idx]
-        
-        atm_options.append({
-            'days_to_expiry': expiry,
-            'strike': atm_option['strike'],
-            'atm_iv': atm_option['imp_vol'],
-            'moneyness': abs(atm_option['strike'] - spot_price) / spot_price
-        })
-    
-    term_structure = pd.DataFrame(atm_options)
-    term_structure = term_structure.sort_values('days_to_expiry')
-    
-    return term_structure
+    """Per-expiry ATM term structure and skew; see term_structure.term_structure.
+
+    `strike` is the forward the ATM IV is interpolated at and `moneyness`
+    its distance from spot.
+    """
+    table = term_structure(df, spot_price)
+    table.insert(1, 'strike', table['forward'])
+    table.insert(3, 'moneyness', (table['forward'] - spot_price).abs() / spot_price)
+    return table
 
-def validate_implied_volatility(df):
+@timed("validate_iv")
+def validate_implied_volatility(df, report=None):
+    """Human-readable issues from quality.quality_report (computed here unless given)."""
+    if report is None:
+        report = quality_report(df)
     issues = []
     
-    missing_iv = df['imp_vol'].isna().sum()
+    missing_iv = int(report['missing_iv'].sum())
     if missing_iv > 0:
         issues.append(f"{missing_iv} options have missing implied volatility")
     
-    extreme_high = (df['imp_vol'] > 2.0).sum()
-    extreme_low = (df['imp_vol'] < 0.01).sum()
+    extreme_high = int(report['extreme_high'].sum())
+    extreme_low = int(report['extreme_low'].sum())
     
     if extreme_high > 0:
         issues.append(f"{extreme_high} options have extremely high IV (>200%)")
@@ -220,18 +372,8 @@ def validate_implied_volatility(df):
         issues.append(f"{extreme_low} options have extremely low IV (<1%)")
     
     if len(df) > 10:
-        for expiry in df['days_to_expiry'].unique():
-            exp_data = df[df['days_to_expiry'] == expiry]
-            if len(exp_data) > 5:
-                atm_strike = exp_data['strike'].iloc[(exp_data['strike'] - exp_data['spot_price'].iloc[0]).abs().argsort()[:1]]
-                if len(atm_strike) > 0:
-                    atm_iv = exp_data[exp_data['strike'] == atm_strike.iloc[0]]['imp_vol'].iloc[0]
-                    if atm_iv is not None:
-                        far_options = exp_data[abs(exp_data['strike'] - atm_strike.iloc[0]) / atm_strike.iloc[0] > 0.2]
-                        if len(far_options) > 0:
-                            far_ivs = far_options['imp_vol'].dropna()
-                            if len(far_ivs) > 0:
-                                if (far_ivs > atm_iv * 3).any():
-                                    issues.append(f"Some {expiry}-day options have IV > 3x ATM IV")
+        flagged = report[(report['options'] > 5) & (report['wing_outliers'] > 0)]
+        for expiry in flagged['days_to_expiry']:
+            issues.append(f"Some {expiry}-day options have IV > 3x ATM IV")
     
     return issues